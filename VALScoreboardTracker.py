@@ -6,10 +6,20 @@ Lots of code is utilised from https://github.com/eihli/image-table-ocr#org67b1fc
 
 import os
 import sys
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import cv2
 import pytesseract
 from config_parser import create_config, read_config
-from ocr_library import functions as srf
+from ocr_library import functions as srf, ROW_WORKERS
+from agent_recognition import get_agent_index
+from ingest import decode_screenshot
+from results_store import results_store
+from map_recognition import map_index
+from layout_profiles import layout_profiles
+from dedup import content_hash, table_hash
 import pyperclip
 from datetime import datetime
 import time
@@ -76,7 +86,134 @@ def get_base_path():
         return os.path.dirname(sys.executable)
     return os.path.dirname(os.path.abspath(__file__))
 
+def process_screenshot(file_path, maps, row_workers=ROW_WORKERS, verbose=True):
+    """
+    Read one scoreboard screenshot into merged rows (date, name, map, agent, stats).
+
+    A file already in the results store byte for byte returns its stored rows.
+    Returns (rows, details) where details holds the dedup hashes and map, and
+    the screenshot_id when the rows came from the store.
+    """
+    def status(message):
+        if verbose:
+            print_status(message)
+
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        raise ValueError(f"could not read image: {e}") from e
+
+    details = {'content_hash': content_hash(data)}
+    screenshot_id = results_store.find_by_content(details['content_hash'])
+    if screenshot_id is not None:
+        status("Screenshot was processed before, using stored results")
+        return results_store.screenshot_rows(screenshot_id), dict(details, screenshot_id=screenshot_id)
+
+    # Decoded once and scaled to 1080p whatever the capture resolution
+    image, image_colored, _ = decode_screenshot(data)
+
+    status("Detecting map...")
+    map_name = srf.find_map_name(image, maps)
+    status(f"Map detected: {map_name}")
+    details['map'] = map_name
+
+    status("Processing scoreboard table...")
+    (x, y, w, h), rows = srf.locate_table(image)
+    table, table_colored = image[y:y+h, x:x+w], image_colored[y:y+h, x:x+w]
+    details['table_hash'] = table_hash(table)
+    cell_images_rows, headshots_images_rows = srf.crop_table_cells(table, table_colored, rows)
+
+    status("Identifying agents...")
+    agents = srf.identify_agents(headshots_images_rows)
+
+    status("Reading table data...")
+    output = srf.read_table_rows(cell_images_rows, composite_stats=True, max_workers=row_workers)
+    current_date = datetime.now().strftime("%d/%m/%Y")
+
+    status("Merging data...")
+    return [
+        [current_date] + row[:1] + [map_name] + [agents[i]] + row[1:] if isinstance(agents[i], str) else [map_name] + row[:1] + agents[i] + row[1:]
+        for i, row in enumerate(output)
+    ], details
+
+def init_worker():
+    """Runs once in every worker process of --jobs mode"""
+    setup_tesseract()
+    # Each worker handles one screenshot at a time, so keep OpenCV single threaded
+    cv2.setNumThreads(1)
+    get_agent_index('./agent-images')
+
+def process_screenshot_job(file_path, maps):
+    """Worker entry point for --jobs mode. Returns ((rows, details), error message)"""
+    try:
+        return process_screenshot(file_path, maps, row_workers=1, verbose=False), None
+    except Exception as e:
+        return None, str(e)
+
+def process_screenshots_parallel(file_paths, maps, jobs):
+    """
+    Process screenshots on `jobs` worker processes. Returns ((rows, details), error message)
+    per file, in the order of file_paths.
+
+    A worker process that dies (crash, out of memory) breaks the whole pool and every
+    unfinished file fails with it. Those files are resubmitted to a new pool with one
+    worker, which reads them in order, so if that pool breaks too the first unfinished
+    file caused it and is the only one given up.
+    """
+    results = [None] * len(file_paths)
+    pending = list(range(len(file_paths)))
+    workers = jobs
+    while pending:
+        broken = False
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            futures = []
+            try:
+                for i in pending:
+                    futures.append((i, pool.submit(process_screenshot_job, file_paths[i], maps)))
+            except BrokenProcessPool:
+                broken = True
+            # Collected in submission order, so results stay in filename order
+            for i, future in futures:
+                try:
+                    results[i] = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                except Exception as e:
+                    results[i] = (None, f"worker failed: {e}")
+
+        unfinished = [i for i in pending if results[i] is None]
+        if broken and workers == 1 and unfinished:
+            results[unfinished[0]] = (None, "worker process stopped unexpectedly")
+            unfinished = unfinished[1:]
+        if unfinished:
+            print_status(f"A worker process stopped unexpectedly, retrying {len(unfinished)} screenshots with one worker...")
+        pending = unfinished
+        workers = 1
+    return results
+
+def layout_size(value):
+    """argparse type of --forget-layout, a WIDTHxHEIGHT resolution"""
+    try:
+        width, height = (int(v) for v in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+    return width, height
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Read VALORANT scoreboard screenshots into scoreboard.csv")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="Number of screenshots processed in parallel, one process each (default: 1)")
+    parser.add_argument('--forget-map', action='append', default=[], metavar='MAP',
+                        help="Drop the stored banners of a map that keeps being recognized wrongly, "
+                             "they are read with OCR again (can be given more than once)")
+    parser.add_argument('--forget-layout', action='append', default=[], type=layout_size, metavar='WxH',
+                        help="Drop the stored scoreboard layout of a resolution after scaling to 1080p height, "
+                             "e.g. 1920x1080, it is detected and learned again (can be given more than once)")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     try:
         print_status("Initializing VALScoreboardTracker...")
         
@@ -100,45 +237,66 @@ def main():
 
         maps = config_data['maps']
 
+        for map_name in args.forget_map:
+            dropped = map_index.forget(map_name)
+            print_status(f"Dropped {dropped} stored banners of {map_name} from the map index")
+        for width, height in args.forget_layout:
+            if layout_profiles.forget(width, height):
+                print_status(f"Dropped the stored layout of {width}x{height}")
+            else:
+                print_status(f"No stored layout of {width}x{height}")
+
         if os.path.exists(scoreboard_path):
             os.remove(scoreboard_path)
             print_status("Removed old scoreboard file")
 
         if os.path.exists(screenshot_folder) and os.path.isdir(screenshot_folder):
-            screenshots = [f for f in os.listdir(screenshot_folder) if f.lower().endswith(".png")]
+            screenshots = sorted(f for f in os.listdir(screenshot_folder) if f.lower().endswith(".png"))
             print_status(f"Found {len(screenshots)} screenshots to process")
+            file_paths = [os.path.join(screenshot_folder, filename) for filename in screenshots]
+
+            if args.jobs > 1 and len(screenshots) > 1:
+                print_status(f"Processing screenshots with {args.jobs} processes...")
+                results = process_screenshots_parallel(file_paths, maps, args.jobs)
+            else:
+                results = []
+                for filename, file_path in zip(screenshots, file_paths):
+                    print_status(f"Processing screenshot: {filename}")
+                    try:
+                        results.append((process_screenshot(file_path, maps), None))
+                    except Exception as e:
+                        results.append((None, str(e)))
+
+            # Results store ids of the screenshots of this run, copies of one are merged
+            processed = {}
+            for filename, (result, error) in zip(screenshots, results):
+                if error is not None:
+                    print_status(f"Skipping {filename}: {error}")
+                    continue
+                merged_output, details = result
+
+                # Every row is kept in the results store, the CSV only gets the configured team/players
+                screenshot_id = details.get('screenshot_id')
+                try:
+                    if screenshot_id is None:
+                        # Copies read in parallel are only found once the first one is stored. A close
+                        # table hash only counts as a copy when the stored rows match the rows read.
+                        screenshot_id = (results_store.find_by_content(details['content_hash'])
+                                         or results_store.find_same_scoreboard(details['table_hash'], details['map'], merged_output))
+                    if screenshot_id is None:
+                        screenshot_id = results_store.save_screenshot(
+                            filename, merged_output, source='cli',
+                            content_hash=details['content_hash'], table_hash=details['table_hash'],
+                        )
+                except Exception as e:
+                    print_status(f"Could not store results of {filename}: {e}")
+
+                if screenshot_id in processed:
+                    print_status(f"Skipping {filename}: same scoreboard as {processed[screenshot_id]}")
+                    continue
+                if screenshot_id is not None:
+                    processed[screenshot_id] = filename
 
-            for filename in screenshots:
-                file_path = os.path.join(screenshot_folder, filename)
-                print_status(f"Processing screenshot: {filename}")
-
-                image = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
-                image_colored = cv2.imread(file_path)
-                
-                print_status("Detecting map...")
-                map_name = srf.find_map_name(image, maps)
-                print_status(f"Map detected: {map_name}")
-
-                print_status("Processing scoreboard table...")
-                image, image_colored = srf.find_tables(image, image_colored)
-
-                print_status("Extracting cell information...")
-                cell_images_rows, headshots_images_rows = srf.extract_cell_images_from_table(image, image_colored)
-
-                print_status("Identifying agents...")
-                agents = srf.identify_agents(headshots_images_rows)
-
-                print_status("Reading table data...")
-                output = srf.read_table_rows(cell_images_rows)
-                current_date = datetime.now().strftime("%d/%m/%Y")
-                
-                print_status("Merging data...")
-                merged_output = [
-                    [current_date] + row[:1] + [map_name] + [agents[i]] + row[1:] if isinstance(agents[i], str) else [map_name] + row[:1] + agents[i] + row[1:]
-                    for i, row in enumerate(output)
-                ]
-
-                print_status("Applying team/player filters...")
                 if config_data['teamSorting']:
                     filtered_output = [row for row in merged_output if config_data['team'] in row[1]]
                 else:
@@ -152,11 +310,6 @@ def main():
             print_status("No screenshots folder found or no PNG files to process")
             return
 
-        print_status("Cleaning up temporary files...")
-        if os.path.exists(os.path.join(base_path, 'temp_headshot.png')):
-            os.remove(os.path.join(base_path, 'temp_headshot.png'))
-            print_status("Temporary files cleaned up")
-
         print_status("Reading final scoreboard data...")
         with open(scoreboard_path, "r", encoding="utf-8") as file:
             scoreboard_data = file.read()
@@ -174,4 +327,6 @@ def main():
         wait_for_user()
 
 if __name__ == "__main__":
+    # Needed for --jobs in the frozen executable
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
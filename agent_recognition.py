@@ -1,7 +1,12 @@
 import cv2
+import hashlib
+import json
+import logging
 import numpy as np
 import os
 import sys
+import threading
+from collections import Counter
 
 def get_base_path():
     if getattr(sys, 'frozen', False):
@@ -71,44 +76,365 @@ def match_histogram(image1, image2):
     hist2 = cv2.normalize(hist2, hist2).flatten()
     return cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
 
+# Compact per-icon feature vector for vectorized batch matching:
+# a mean-centred thumbnail plus a hue/saturation histogram, each L2
+# normalized so a dot product between two vectors is a weighted correlation
+FEATURE_THUMB_SIZE = (16, 16)
+FEATURE_HUE_BINS = 18
+FEATURE_SAT_BINS = 8
+FEATURE_THUMB_WEIGHT = 0.6
+FEATURE_HIST_WEIGHT = 0.4
+
+# Cascade matching: the coarse feature score decides on its own when the best
+# agent leads the runner-up by at least this margin, otherwise SIFT+ORB voting
+# runs on the top candidates only
+CASCADE_MARGIN_THRESHOLD = 0.1
+CASCADE_TOP_K = 3
+
+def extract_icon_features(images):
+    thumbs = np.stack([
+        cv2.resize(to_bgr(image), FEATURE_THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        for image in images
+    ]).astype(np.float32)
+    hsv = np.stack([cv2.cvtColor(thumb.astype(np.uint8), cv2.COLOR_BGR2HSV) for thumb in thumbs])
+
+    # Thumbnail part, centred per icon so lighting differences cancel out
+    count = len(images)
+    pixels = thumbs.reshape(count, -1)
+    pixels -= pixels.mean(axis=1, keepdims=True)
+
+    # Hue/saturation histogram of every icon in a single bincount
+    hue_bins = (hsv[..., 0].astype(np.int64) * FEATURE_HUE_BINS) // 180
+    sat_bins = (hsv[..., 1].astype(np.int64) * FEATURE_SAT_BINS) // 256
+    bins_per_icon = FEATURE_HUE_BINS * FEATURE_SAT_BINS
+    flat_bins = (hue_bins * FEATURE_SAT_BINS + sat_bins).reshape(count, -1)
+    flat_bins += np.arange(count)[:, None] * bins_per_icon
+    hists = np.bincount(flat_bins.ravel(), minlength=count * bins_per_icon)
+    hists = hists.reshape(count, bins_per_icon).astype(np.float32)
+    hists -= hists.mean(axis=1, keepdims=True)
+
+    def unit_rows(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-6)
+
+    return np.hstack([
+        unit_rows(pixels) * np.sqrt(FEATURE_THUMB_WEIGHT),
+        unit_rows(hists) * np.sqrt(FEATURE_HIST_WEIGHT),
+    ]).astype(np.float32)
+
+def to_bgr(image):
+    if len(image.shape) == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return image
+
+# Reference preprocessing shared by the index and one-off matching
+def prepare_reference_image(ref_image):
+    ref_image_gray = cv2.cvtColor(ref_image, cv2.COLOR_BGR2GRAY)
+    ref_image_gray = resize_image(ref_image_gray, (50, 50))
+    return equalize_histogram(ref_image_gray)
+
+def normalized_histogram(image):
+    hist = cv2.calcHist([image], [0], None, [256], [0, 256])
+    return cv2.normalize(hist, hist).flatten()
+
+class AgentIndex:
+    """Reference agent features computed once and reused for every headshot"""
+
+    def __init__(self, reference_images, agent_names):
+        self.agent_names = list(agent_names)
+        self.create_matchers()
+        self.reset_cascade_stats()
+
+        self.sift_descriptors = []
+        self.orb_descriptors = []
+        self.histograms = []
+        for ref_image in reference_images:
+            ref_image_gray = prepare_reference_image(ref_image)
+            self.sift_descriptors.append(self.sift.detectAndCompute(ref_image_gray, None)[1])
+            self.orb_descriptors.append(self.orb.detectAndCompute(ref_image_gray, None)[1])
+            self.histograms.append(normalized_histogram(ref_image_gray))
+
+        # (agents x features) matrix for batch matching
+        self.features = extract_icon_features(reference_images)
+
+    def create_matchers(self):
+        # Detectors and matchers are created once instead of per comparison
+        self.sift = cv2.SIFT_create()
+        self.orb = cv2.ORB_create()
+        self.flann = cv2.FlannBasedMatcher(dict(algorithm=1, trees=5), dict(checks=50))
+        self.bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+
+    @classmethod
+    def from_folder(cls, folder):
+        reference_images, agent_names = load_images_from_folder(folder)
+        return cls(reference_images, agent_names)
+
+    @classmethod
+    def from_arrays(cls, agent_names, sift_descriptors, orb_descriptors, histograms, features):
+        # Rebuild an index from previously extracted features without decoding any image
+        index = cls.__new__(cls)
+        index.agent_names = list(agent_names)
+        index.create_matchers()
+        index.reset_cascade_stats()
+        index.sift_descriptors = list(sift_descriptors)
+        index.orb_descriptors = list(orb_descriptors)
+        index.histograms = list(histograms)
+        index.features = features
+        return index
+
+    def match_sift(self, query_descriptors, ref_descriptors):
+        matches = self.flann.knnMatch(query_descriptors, ref_descriptors, k=2)
+        # Apply ratio test
+        return [m for m, n in matches if m.distance < 0.75 * n.distance]
+
+    def match_orb(self, query_descriptors, ref_descriptors):
+        return self.bf.match(query_descriptors, ref_descriptors)
+
+    def reset_cascade_stats(self):
+        self.cascade_stats = Counter()
+        self.cascade_stats_lock = threading.Lock()
+
+    def match_prepared(self, input_image, candidates=None):
+        # input_image is already grayscale, 50x50 and equalized.
+        # candidates optionally restricts voting to these reference indices.
+        _, sift_descriptors = self.sift.detectAndCompute(input_image, None)
+        _, orb_descriptors = self.orb.detectAndCompute(input_image, None)
+        input_hist = normalized_histogram(input_image)
+
+        max_matches = 0
+        matching_agent = None
+
+        if candidates is None:
+            candidates = range(len(self.agent_names))
+        for i in sorted(candidates):
+            agent_name = self.agent_names[i]
+            # Feature matching using SIFT
+            sift_matches = self.match_sift(sift_descriptors, self.sift_descriptors[i])
+
+            # Feature matching using ORB
+            orb_matches = self.match_orb(orb_descriptors, self.orb_descriptors[i])
+
+            # Histogram matching
+            hist_score = cv2.compareHist(input_hist, self.histograms[i], cv2.HISTCMP_CORREL)
+
+            # Weighted voting system
+            total_matches = len(sift_matches) + len(orb_matches) + hist_score
+
+            if total_matches > max_matches:
+                max_matches = total_matches
+                matching_agent = agent_name
+
+        return matching_agent
+
+    def match_image(self, input_image):
+        # Accepts an in-memory BGR or grayscale headshot, nothing touches the disk
+        if len(input_image.shape) == 3:
+            input_image = cv2.cvtColor(input_image, cv2.COLOR_BGR2GRAY)
+        input_image = resize_image(input_image, (50, 50))
+        input_image = equalize_histogram(input_image)
+        return self.match_prepared(input_image)
+
+    def match_batch(self, input_images):
+        """
+        Scores every headshot against every reference agent in one matrix product.
+
+        Returns a list of (agent_name, margin) per input image, where margin is
+        the score gap between the best and second best agent.
+        """
+        if len(input_images) == 0:
+            return []
+
+        order, margins = self.coarse_scores(input_images)
+        return [(self.agent_names[i], float(m)) for i, m in zip(order[:, 0], margins)]
+
+    def coarse_scores(self, input_images):
+        # Returns reference indices sorted best first per image, and the best/runner-up margin
+        scores = extract_icon_features(input_images) @ self.features.T
+        order = np.argsort(-scores, axis=1, kind='stable')
+        rows = np.arange(len(input_images))
+        best = scores[rows, order[:, 0]]
+        if scores.shape[1] > 1:
+            margins = best - scores[rows, order[:, 1]]
+        else:
+            margins = best
+        return order, margins
+
+    def match_cascade(self, input_images, margin_threshold=CASCADE_MARGIN_THRESHOLD, top_k=CASCADE_TOP_K):
+        """
+        Two stage matching: the batch feature score first, SIFT+ORB voting among
+        the top_k coarse candidates only when the coarse margin is too small.
+
+        Returns a list of (agent_name, stage) per input image, where stage is
+        'coarse' or 'fine'. Stage counts accumulate in cascade_stats.
+        """
+        if len(input_images) == 0:
+            return []
+
+        order, margins = self.coarse_scores(input_images)
+        results = []
+        for image, ranked, margin in zip(input_images, order, margins):
+            if margin >= margin_threshold:
+                results.append((self.agent_names[ranked[0]], 'coarse'))
+            else:
+                prepared = image
+                if len(prepared.shape) == 3:
+                    prepared = cv2.cvtColor(prepared, cv2.COLOR_BGR2GRAY)
+                prepared = equalize_histogram(resize_image(prepared, (50, 50)))
+                agent_name = self.match_prepared(prepared, candidates=ranked[:top_k])
+                results.append((agent_name or self.agent_names[ranked[0]], 'fine'))
+
+        with self.cascade_stats_lock:
+            self.cascade_stats.update(stage for _, stage in results)
+        return results
+
+    def cascade_report(self):
+        # How often each cascade stage made the final decision so far
+        with self.cascade_stats_lock:
+            total = sum(self.cascade_stats.values())
+            return {
+                stage: {'count': count, 'share': count / total}
+                for stage, count in self.cascade_stats.items()
+            }
+
+    def match_file(self, input_image_path):
+        return self.match_image(cv2.imread(input_image_path, cv2.IMREAD_GRAYSCALE))
+
+# On-disk feature cache, stored next to the reference folder as plain .npy
+# files so it can be memory-mapped (np.load cannot memory-map .npz archives)
+AGENT_CACHE_VERSION = 1
+
+def get_agent_cache_folder(folder):
+    folder = folder.rstrip(os.sep)
+    return os.path.join(os.path.dirname(folder), '.' + os.path.basename(folder) + '-cache')
+
+def folder_stat_signature(folder):
+    # Cheap check (names, sizes, mtimes) used to notice changes while running
+    signature = []
+    for filename in sorted(os.listdir(folder)):
+        path = os.path.join(folder, filename)
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            signature.append((filename, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+def folder_cache_key(folder):
+    # File names, mtimes and content hashes of every reference image
+    digest = hashlib.sha1(f"v{AGENT_CACHE_VERSION};opencv {cv2.__version__}".encode())
+    for filename, size, mtime_ns in folder_stat_signature(folder):
+        with open(os.path.join(folder, filename), 'rb') as f:
+            content_hash = hashlib.sha1(f.read()).hexdigest()
+        digest.update(f"{filename};{size};{mtime_ns};{content_hash}\n".encode())
+    return digest.hexdigest()
+
+def pack_descriptors(descriptors, width, dtype):
+    # Variable length descriptor sets stored as one array plus row counts
+    # (-1 marks an image without keypoints, i.e. None descriptors)
+    counts = np.array([-1 if d is None else len(d) for d in descriptors], dtype=np.int64)
+    present = [d for d in descriptors if d is not None]
+    packed = np.concatenate(present) if present else np.empty((0, width), dtype=dtype)
+    return packed.astype(dtype, copy=False), counts
+
+def unpack_descriptors(packed, counts):
+    descriptors = []
+    start = 0
+    for count in counts:
+        if count < 0:
+            descriptors.append(None)
+            continue
+        descriptors.append(packed[start:start + count])
+        start += count
+    return descriptors
+
+def save_agent_cache(index, cache_folder, key):
+    os.makedirs(cache_folder, exist_ok=True)
+    sift, sift_counts = pack_descriptors(index.sift_descriptors, 128, np.float32)
+    orb, orb_counts = pack_descriptors(index.orb_descriptors, 32, np.uint8)
+    arrays = {
+        'sift': sift,
+        'sift_counts': sift_counts,
+        'orb': orb,
+        'orb_counts': orb_counts,
+        'histograms': np.array(index.histograms, dtype=np.float32).reshape(len(index.agent_names), -1),
+        'features': np.asarray(index.features, dtype=np.float32),
+    }
+    # Other processes may have the arrays memory mapped, so each one is written to
+    # a private temp file and swapped in instead of being rewritten in place
+    for name, array in arrays.items():
+        array_path = os.path.join(cache_folder, f"{key}.{name}.npy")
+        temp_path = f"{array_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(temp_path, array_path)
+
+    # The manifest is written last and atomically, so readers never see a half written cache
+    manifest_path = os.path.join(cache_folder, 'manifest.json')
+    temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump({'key': key, 'agent_names': index.agent_names}, f)
+    os.replace(temp_path, manifest_path)
+
+    # Drop files belonging to older keys
+    for filename in os.listdir(cache_folder):
+        if filename.endswith('.npy') and not filename.startswith(key + '.'):
+            try:
+                os.remove(os.path.join(cache_folder, filename))
+            except OSError:
+                pass
+
+def load_agent_cache(cache_folder, key):
+    try:
+        with open(os.path.join(cache_folder, 'manifest.json')) as f:
+            manifest = json.load(f)
+        if manifest.get('key') != key:
+            return None
+
+        def load(name):
+            return np.load(os.path.join(cache_folder, f"{key}.{name}.npy"), mmap_mode='r')
+
+        return AgentIndex.from_arrays(
+            manifest['agent_names'],
+            unpack_descriptors(load('sift'), load('sift_counts')),
+            unpack_descriptors(load('orb'), load('orb_counts')),
+            load('histograms'),
+            load('features'),
+        )
+    except (OSError, ValueError, KeyError):
+        return None
+
+def load_agent_index(folder):
+    # Use the on-disk cache when it matches the folder contents, otherwise rebuild it
+    cache_folder = get_agent_cache_folder(folder)
+    key = folder_cache_key(folder)
+    index = load_agent_cache(cache_folder, key)
+    if index is not None:
+        return index
+
+    logging.info(f"Building agent reference cache for {folder}")
+    index = AgentIndex.from_folder(folder)
+    try:
+        save_agent_cache(index, cache_folder, key)
+    except OSError as e:
+        logging.warning(f"Could not write agent reference cache: {e}")
+    return index
+
+# One index per reference folder, reloaded when the folder contents change
+_agent_indexes = {}
+_agent_indexes_lock = threading.Lock()
+
+def get_agent_index(folder='./agent-images'):
+    if not os.path.isabs(folder):
+        folder = os.path.join(get_base_path(), folder)
+
+    with _agent_indexes_lock:
+        signature = folder_stat_signature(folder)
+        cached = _agent_indexes.get(folder)
+        if cached is None or cached[0] != signature:
+            _agent_indexes[folder] = (signature, load_agent_index(folder))
+        return _agent_indexes[folder][1]
+
 def find_matching_agent(input_image_path, reference_images, agent_names):
     # Convert to absolute path if relative
     if not os.path.isabs(input_image_path):
         input_image_path = os.path.join(get_base_path(), input_image_path)
-        
-    input_image = cv2.imread(input_image_path, cv2.IMREAD_GRAYSCALE)
-    input_image = resize_image(input_image, (50, 50))
-    input_image = equalize_histogram(input_image)
-    
-    sift_keypoints, sift_descriptors = extract_sift_features(input_image)
-    orb_keypoints, orb_descriptors = extract_orb_features(input_image)
-    
-    max_matches = 0
-    max_hist_score = 0
-    matching_agent = None
-    
-    for i, ref_image in enumerate(reference_images):
-        ref_image_gray = cv2.cvtColor(ref_image, cv2.COLOR_BGR2GRAY)
-        ref_image_gray = resize_image(ref_image_gray, (50, 50))
-        ref_image_gray = equalize_histogram(ref_image_gray)
-        
-        # Feature matching using SIFT
-        _, ref_sift_descriptors = extract_sift_features(ref_image_gray)
-        sift_matches = match_sift_features(sift_descriptors, ref_sift_descriptors)
-        
-        # Feature matching using ORB
-        _, ref_orb_descriptors = extract_orb_features(ref_image_gray)
-        orb_matches = match_orb_features(orb_descriptors, ref_orb_descriptors)
-        
-        # Histogram matching
-        hist_score = match_histogram(input_image, ref_image_gray)
-        
-        # Weighted voting system
-        total_matches = len(sift_matches) + len(orb_matches) + hist_score
-        
-        if total_matches > max_matches:
-            max_matches = total_matches
-            max_hist_score = hist_score
-            matching_agent = agent_names[i]
-    
-    return matching_agent
\ No newline at end of file
+
+    return AgentIndex(reference_images, agent_names).match_file(input_image_path)
@@ -1,11 +1,15 @@
 import os
 import sys
-import cv2
 import pytesseract
 from flask import Flask, render_template, request, jsonify, send_file, flash, redirect, url_for
 from werkzeug.utils import secure_filename
 from config_parser import create_config, read_config
-from ocr_library import functions as srf
+from ocr_library import functions as srf, ROW_WORKERS
+from ocr_cache import ocr_cache
+from jobs import job_manager
+from dedup import content_hash, table_hash
+from results_store import results_store, DEFAULT_PAGE_SIZE
+from ingest import decode_screenshot, load_screenshot
 from auto_detection import auto_detect_teams_and_players
 import tempfile
 import shutil
@@ -18,11 +22,9 @@ app = Flask(__name__)
 app.secret_key = 'valorant_scoreboard_tracker_secret_key'
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
 def allowed_file(filename):
@@ -60,32 +62,49 @@ def setup_tesseract():
         print(f"Tesseract setup error: {e}")
         return False
 
-def process_screenshot_raw(file_path, config_data):
-    """Process a single screenshot and return raw data without filtering"""
+def process_screenshot_raw(image_data, config_data, filename='upload'):
+    """
+    Process a single screenshot (the encoded file bytes) and return raw data without filtering.
+
+    A file already in the results store byte for byte returns its stored rows
+    instead of being read again. Other screenshots are read and stored, unless
+    a stored screenshot with a close table hash has the same rows.
+
+    Returns:
+        (rows, error, details) where details holds the screenshot_id in the
+        results store and whether the rows were cached.
+    """
     try:
         maps = config_data['maps']
         
-        # Read the image
-        image = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
-        image_colored = cv2.imread(file_path)
+        # The same file uploaded again is answered without decoding it
+        file_hash = content_hash(image_data)
+        screenshot_id = results_store.find_by_content(file_hash)
+        if screenshot_id is not None:
+            return results_store.screenshot_rows(screenshot_id), None, {'screenshot_id': screenshot_id, 'cached': True}
         
-        if image is None:
-            return None, "Failed to read image file"
+        # Decode the image once, at 1080p whatever the capture resolution
+        try:
+            image, image_colored, _ = decode_screenshot(image_data)
+        except ValueError:
+            return None, "Failed to read image file", {}
         
         # Detect map
         map_name = srf.find_map_name(image, maps)
         
-        # Process scoreboard table
-        image, image_colored = srf.find_tables(image, image_colored)
+        # Find the scoreboard table, a re-encoded or recaptured copy has a close table hash
+        (x, y, w, h), rows = srf.locate_table(image)
+        table, table_colored = image[y:y+h, x:x+w], image_colored[y:y+h, x:x+w]
+        scoreboard_hash = table_hash(table)
         
         # Extract cell information
-        cell_images_rows, headshots_images_rows = srf.extract_cell_images_from_table(image, image_colored)
+        cell_images_rows, headshots_images_rows = srf.crop_table_cells(table, table_colored, rows)
         
         # Identify agents
         agents = srf.identify_agents(headshots_images_rows)
         
         # Read table data with enhanced OCR
-        output = srf.read_table_rows(cell_images_rows, headshots_images_rows)
+        output = srf.read_table_rows(cell_images_rows, headshots_images_rows, composite_stats=True, max_workers=ROW_WORKERS)
         current_date = datetime.now().strftime("%d/%m/%Y")
         
         # Merge data without filtering
@@ -96,37 +115,43 @@ def process_screenshot_raw(file_path, config_data):
                 merged_row = [current_date] + row[:1] + [map_name] + [agent] + row[1:]
                 merged_output.append(merged_row)
         
-        return merged_output, None
+        # Keep every row in the results store, once per scoreboard
+        try:
+            screenshot_id = results_store.find_same_scoreboard(scoreboard_hash, map_name, merged_output)
+            if screenshot_id is None:
+                screenshot_id = results_store.save_screenshot(
+                    filename, merged_output, source='web', content_hash=file_hash, table_hash=scoreboard_hash
+                )
+        except Exception as e:
+            print(f"Could not store results of {filename}: {e}")
+        
+        return merged_output, None, {'screenshot_id': screenshot_id, 'cached': False}
         
     except Exception as e:
-        return None, f"Error processing screenshot: {str(e)}"
+        return None, f"Error processing screenshot: {str(e)}", {}
 
 def process_screenshot(file_path, config_data):
     """Process a single screenshot and return the results (legacy function for compatibility)"""
     try:
         maps = config_data['maps']
         
-        # Read the image
-        image = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
-        image_colored = cv2.imread(file_path)
-        
-        if image is None:
+        # Read the image once, at 1080p whatever the capture resolution
+        try:
+            image, image_colored, _ = load_screenshot(file_path)
+        except ValueError:
             return None, "Failed to read image file"
         
         # Detect map
         map_name = srf.find_map_name(image, maps)
         
-        # Process scoreboard table
-        image, image_colored = srf.find_tables(image, image_colored)
-        
-        # Extract cell information
-        cell_images_rows, headshots_images_rows = srf.extract_cell_images_from_table(image, image_colored)
+        # Find the scoreboard table and extract cell information
+        cell_images_rows, headshots_images_rows = srf.detect_table_cells(image, image_colored)
         
         # Identify agents
         agents = srf.identify_agents(headshots_images_rows)
         
         # Read table data with enhanced OCR
-        output = srf.read_table_rows(cell_images_rows, headshots_images_rows)
+        output = srf.read_table_rows(cell_images_rows, headshots_images_rows, composite_stats=True, max_workers=ROW_WORKERS)
         current_date = datetime.now().strftime("%d/%m/%Y")
         
         # Merge data
@@ -195,63 +220,26 @@ maps = {maps}
         flash(f'Error updating configuration: {str(e)}', 'error')
         return redirect(url_for('config_page'))
 
-@app.route('/upload', methods=['POST'])
-def upload_files():
-    if 'files' not in request.files:
-        return jsonify({'error': 'No files provided'}), 400
-    
-    files = request.files.getlist('files')
-    
-    if not files or all(file.filename == '' for file in files):
-        return jsonify({'error': 'No files selected'}), 400
-    
-    # Setup Tesseract
-    if not setup_tesseract():
-        return jsonify({'error': 'Failed to initialize Tesseract OCR'}), 500
-    
-    # Load configuration (fallback only)
-    try:
-        config_data = read_config()
-    except:
-        config_data = create_config()
-    
-    results = []
-    all_raw_data = []  # Store raw data for auto-detection
+def process_upload(filename, image_data, config_data, batch):
+    """
+    Process one uploaded screenshot of a batch.
+
+    batch maps the results store ids of the screenshots processed so far in
+    this upload to their file names. A copy of an earlier screenshot of the
+    batch adds no rows and is reported as its duplicate.
+    """
+    raw_data, error, details = process_screenshot_raw(image_data, config_data, filename)
+    screenshot_id = details.get('screenshot_id')
+    if error is None and screenshot_id is not None:
+        if screenshot_id in batch:
+            return [], None, dict(details, duplicate_of=batch[screenshot_id])
+        batch[screenshot_id] = filename
+    return raw_data, error, details
+
+def summarize_upload(results, all_raw_data):
+    """Auto-detect teams and players over a whole batch and build the upload result"""
     all_processed_data = []
     
-    # Create uploads directory if it doesn't exist
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    
-    # First pass: Process all screenshots to extract raw data
-    for file in files:
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
-            
-            # Process the screenshot without filtering
-            raw_data, error = process_screenshot_raw(file_path, config_data)
-            
-            if error:
-                results.append({
-                    'filename': filename,
-                    'status': 'error',
-                    'error': error
-                })
-            else:
-                results.append({
-                    'filename': filename,
-                    'status': 'success',
-                    'raw_count': len(raw_data)
-                })
-                all_raw_data.extend(raw_data)
-            
-            # Clean up uploaded file
-            try:
-                os.remove(file_path)
-            except:
-                pass
-    
     # Auto-detect teams and players from all raw data
     auto_config = {}
     detection_summary = "No data processed"
@@ -304,7 +292,7 @@ def upload_files():
         csv_content = output.getvalue()
         output.close()
     
-    return jsonify({
+    return {
         'results': results,
         'csv_content': csv_content,
         'total_records': len(all_processed_data),
@@ -318,7 +306,74 @@ def upload_files():
                 'player_count': len(auto_config.get('players', []))
             }
         }
-    })
+    }
+
+@app.route('/upload', methods=['POST'])
+def upload_files():
+    if 'files' not in request.files:
+        return jsonify({'error': 'No files provided'}), 400
+    
+    files = request.files.getlist('files')
+    
+    if not files or all(file.filename == '' for file in files):
+        return jsonify({'error': 'No files selected'}), 400
+    
+    # Setup Tesseract
+    if not setup_tesseract():
+        return jsonify({'error': 'Failed to initialize Tesseract OCR'}), 500
+    
+    # Load configuration (fallback only)
+    try:
+        config_data = read_config()
+    except:
+        config_data = create_config()
+    
+    # Screenshots are processed in the background, the page polls /jobs/<job_id>
+    uploads = [
+        (secure_filename(file.filename), file.read())
+        for file in files
+        if file and allowed_file(file.filename)
+    ]
+    if not uploads:
+        return jsonify({'error': 'No supported image files selected'}), 400
+    
+    batch = {}
+    job = job_manager.submit(
+        uploads,
+        lambda filename, image_data: process_upload(filename, image_data, config_data, batch),
+        summarize_upload,
+    )
+    return jsonify({'job_id': job.id, 'status_url': url_for('job_status', job_id=job.id)}), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.to_dict())
+
+def paged_query(query):
+    """Run a results store query with the filters and paging of the request arguments"""
+    filters = request.args.to_dict()
+    try:
+        limit = int(filters.pop('limit', DEFAULT_PAGE_SIZE))
+        offset = int(filters.pop('offset', 0))
+        items, total = query(limit=limit, offset=offset, **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': items, 'total': total, 'limit': limit, 'offset': offset})
+
+@app.route('/api/rows')
+def api_rows():
+    return paged_query(results_store.query_rows)
+
+@app.route('/api/screenshots')
+def api_screenshots():
+    return paged_query(results_store.query_screenshots)
+
+@app.route('/ocr_cache_stats')
+def ocr_cache_stats():
+    return jsonify(ocr_cache.stats())
 
 @app.route('/download_csv')
 def download_csv():
@@ -341,9 +396,6 @@ def download_csv():
     )
 
 if __name__ == '__main__':
-    # Ensure required directories exist
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    
     # Initialize Tesseract
     setup_tesseract()
     
@@ -283,6 +283,15 @@ class TeamDetector:
         
         return analysis
 
+    def extract_team_tag(self, name: str) -> str:
+        """Team tag of a single player name, or "" if it has none"""
+        clean_name = self.clean_player_name(name)
+        for pattern in self.team_tag_patterns:
+            match = re.match(pattern, clean_name, re.IGNORECASE)
+            if match:
+                return match.group(1).upper()
+        return ""
+
     def extract_most_common_tag(self, players: List[str]) -> str:
         """Extract the most common team tag from a list of players"""
         tags = []
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Rectangle Overlap Benchmark
+Compares functions.get_non_overlapping_rectangles with the original nested loop
+version on generated rectangle sets, checking that both keep the same rectangles.
+
+    python benchmark_rectangles.py --sizes 50 200 1000 --repeat 5
+"""
+
+import argparse
+import random
+import time
+
+from ocr_library import functions as srf
+
+
+def legacy_non_overlapping_rectangles(rectangles):
+    """The original quadratic implementation, kept as the reference"""
+    non_overlapping_rectangles = []
+    overlapping_rectangles = []
+    for i, rect1 in enumerate(rectangles):
+        overlaps = False
+        for j, rect2 in enumerate(rectangles):
+            if i != j:
+                if rect1[0] < rect2[0] + rect2[2] and rect1[0] + rect1[2] > rect2[0] and rect1[1] < rect2[1] + rect2[3] and rect1[1] + rect1[3] > rect2[1]:
+                    overlaps = True
+                    if rect1[2] * rect1[3] > rect2[2] * rect2[3]:
+                        larger_rect = rect1
+                        smaller_rect = rect2
+                    else:
+                        larger_rect = rect2
+                        smaller_rect = rect1
+                    break
+        if overlaps:
+            overlapping_rectangles.append(smaller_rect)
+        else:
+            non_overlapping_rectangles.append(rect1)
+            larger_rect = rect1
+        non_overlapping_rectangles.append(larger_rect)
+    for rect in overlapping_rectangles:
+        if rect in non_overlapping_rectangles:
+            non_overlapping_rectangles.remove(rect)
+    non_overlapping_rectangles = list(set(non_overlapping_rectangles))
+    return non_overlapping_rectangles
+
+
+def noisy_row(rng, count, width=1030, height=44):
+    """Contour boxes of a noisy player row: specks and digit blobs of all sizes"""
+    rectangles = []
+    for _ in range(count):
+        w = rng.randint(1, 60)
+        h = rng.randint(1, height)
+        rectangles.append((rng.randint(0, width - w), rng.randint(0, height - h), w, h))
+    # Exact duplicates, as RETR_TREE produces for inner and outer contours
+    rectangles += rng.sample(rectangles, count // 10)
+    rng.shuffle(rectangles)
+    return rectangles
+
+
+def scattered(rng, count, width=1920, height=1080):
+    """Rectangles spread over a whole screenshot"""
+    rectangles = []
+    for _ in range(count):
+        w = rng.randint(1, 120)
+        h = rng.randint(1, 120)
+        rectangles.append((rng.randint(0, width - w), rng.randint(0, height - h), w, h))
+    return rectangles
+
+
+def best_time(function, rectangles, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(rectangles)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rectangle overlap filter against the original version")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 1000], help="Rectangle counts to generate")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement, the best one is reported")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mismatches = 0
+    print(f"{'set':<12}{'count':>7}{'original':>12}{'sweep':>12}{'speedup':>9}  same")
+    for name, generate in (('noisy row', noisy_row), ('scattered', scattered)):
+        for size in args.sizes:
+            rectangles = generate(rng, size)
+            expected = legacy_non_overlapping_rectangles(rectangles)
+            result = srf.get_non_overlapping_rectangles(rectangles)
+            same = sorted(expected) == sorted(result) and len(result) == len(set(result))
+            mismatches += not same
+            legacy_time = best_time(legacy_non_overlapping_rectangles, rectangles, args.repeat)
+            sweep_time = best_time(srf.get_non_overlapping_rectangles, rectangles, args.repeat)
+            print(f"{name:<12}{len(rectangles):>7}{legacy_time * 1000:>10.2f}ms{sweep_time * 1000:>10.2f}ms"
+                  f"{legacy_time / sweep_time:>8.1f}x  {'yes' if same else 'NO'}")
+
+    if mismatches:
+        print(f"{mismatches} rectangle sets differ from the original implementation")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Dedup Module
+Hashes that recognize screenshots which were processed before: an exact hash
+of the file bytes, and a perceptual hash of the scoreboard table that survives
+re-encoding and separate captures of the same scoreboard.
+"""
+
+import hashlib
+
+import cv2
+import numpy as np
+
+# Size (width, height) the binarized table is shrunk to for the difference hash,
+# about one column per character so that changed stats change the hash
+TABLE_HASH_SIZE = (96, 20)
+# Tables whose hashes differ in at most this many bits show the same scoreboard
+MAX_TABLE_DISTANCE = 24
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 of the encoded screenshot"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def table_hash(table: np.ndarray) -> str:
+    """
+    Difference hash of a grayscale table region, as hex.
+
+    The table is binarized first, so the flat row backgrounds hash to stable
+    zeros and only the text decides the hash, not compression noise.
+    """
+    _, binary = cv2.threshold(table, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    width, height = TABLE_HASH_SIZE
+    small = cv2.resize(binary, (width + 1, height), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return np.packbits(small[:, 1:] > small[:, :-1]).tobytes().hex()
+
+
+def hash_distance(hash1: str, hash2: str) -> int:
+    """Number of differing bits of two hex hashes of the same size"""
+    bits1 = np.frombuffer(bytes.fromhex(hash1), dtype=np.uint8)
+    bits2 = np.frombuffer(bytes.fromhex(hash2), dtype=np.uint8)
+    if bits1.shape != bits2.shape:
+        raise ValueError("hashes have different sizes")
+    return int(np.unpackbits(bits1 ^ bits2).sum())
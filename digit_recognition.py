@@ -0,0 +1,195 @@
+"""
+Digit Recognition Module
+Template based recognizer for the numeric stat cells of the VALORANT scoreboard
+"""
+
+import os
+import sys
+import hashlib
+import threading
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+
+# Size every glyph is normalized to before comparison (width, height)
+GLYPH_SIZE = (16, 24)
+# Components smaller than this many pixels are treated as noise
+MIN_GLYPH_AREA = 12
+# Components shorter than this fraction of the tallest one are treated as noise
+MIN_GLYPH_HEIGHT_RATIO = 0.5
+# Required lead of the best digit over the best template of any other digit
+MIN_DIGIT_MARGIN = 0.05
+
+
+def get_base_path():
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+class DigitRecognizer:
+    """Classifies digit glyphs by correlation with stored templates of the game font"""
+
+    def __init__(self, template_folder: str = './digit-templates'):
+        if not os.path.isabs(template_folder):
+            template_folder = os.path.join(get_base_path(), template_folder)
+        self.template_folder = template_folder
+        self.templates = None
+        self.template_labels = []
+        self.fingerprint = ''
+        self._lock = threading.Lock()
+
+    def load_templates(self):
+        """Load every '<digit>_<id>.png' file from the template folder"""
+        vectors = []
+        labels = []
+        if os.path.isdir(self.template_folder):
+            for filename in sorted(os.listdir(self.template_folder)):
+                label = filename.split('_', 1)[0]
+                if not (label.isdigit() and len(label) == 1 and filename.lower().endswith('.png')):
+                    continue
+                glyph = cv2.imread(os.path.join(self.template_folder, filename), cv2.IMREAD_GRAYSCALE)
+                if glyph is None:
+                    continue
+                vectors.append(self.glyph_vector(self.binarize(glyph)))
+                labels.append(label)
+
+        self.templates = np.array(vectors, dtype=np.float32).reshape(len(vectors), GLYPH_SIZE[0] * GLYPH_SIZE[1])
+        self.template_labels = labels
+        # Identifies the loaded template set, so cached reads are not reused after it changes
+        digest = hashlib.sha1(self.templates.tobytes())
+        digest.update(''.join(labels).encode())
+        self.fingerprint = digest.hexdigest()
+
+    def ensure_loaded(self):
+        with self._lock:
+            if self.templates is None:
+                self.load_templates()
+
+    def reload(self):
+        with self._lock:
+            self.load_templates()
+
+    def has_templates(self) -> bool:
+        self.ensure_loaded()
+        return len(self.template_labels) > 0
+
+    @staticmethod
+    def binarize(image: np.ndarray) -> np.ndarray:
+        """Binary mask with ink as 255, whatever the polarity of the input"""
+        if len(image.shape) == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # The cell border is background, so whichever class dominates it is not ink
+        border = np.concatenate([mask[0, :], mask[-1, :], mask[:, 0], mask[:, -1]])
+        if np.count_nonzero(border) > border.size / 2:
+            mask = cv2.bitwise_not(mask)
+        return mask
+
+    @staticmethod
+    def segment(mask: np.ndarray) -> List[np.ndarray]:
+        """Split a binary cell mask into glyph masks ordered left to right"""
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        boxes = [
+            tuple(stats[i, :4]) for i in range(1, count)
+            if stats[i, cv2.CC_STAT_AREA] >= MIN_GLYPH_AREA
+        ]
+        if not boxes:
+            return []
+
+        tallest = max(h for _, _, _, h in boxes)
+        boxes = [b for b in boxes if b[3] >= MIN_GLYPH_HEIGHT_RATIO * tallest]
+
+        # Merge components that overlap horizontally (broken strokes of one glyph)
+        boxes.sort(key=lambda b: b[0])
+        merged = []
+        for x, y, w, h in boxes:
+            if merged and x < merged[-1][0] + merged[-1][2]:
+                mx, my, mw, mh = merged[-1]
+                x1, y1 = min(mx, x), min(my, y)
+                x2, y2 = max(mx + mw, x + w), max(my + mh, y + h)
+                merged[-1] = (x1, y1, x2 - x1, y2 - y1)
+            else:
+                merged.append((x, y, w, h))
+
+        return [mask[y:y + h, x:x + w] for x, y, w, h in merged]
+
+    @staticmethod
+    def glyph_vector(mask: np.ndarray) -> np.ndarray:
+        """Normalize a glyph to GLYPH_SIZE, keeping its aspect ratio, as a unit vector"""
+        points = cv2.findNonZero(mask)
+        if points is not None:
+            x, y, w, h = cv2.boundingRect(points)
+            mask = mask[y:y + h, x:x + w]
+
+        target_w, target_h = GLYPH_SIZE
+        h, w = mask.shape[:2]
+        factor = min(target_w / w, target_h / h)
+        new_w = max(1, int(round(w * factor)))
+        new_h = max(1, int(round(h * factor)))
+        resized = cv2.resize(mask, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+        canvas = np.zeros((target_h, target_w), dtype=np.float32)
+        top = (target_h - new_h) // 2
+        left = (target_w - new_w) // 2
+        canvas[top:top + new_h, left:left + new_w] = resized
+
+        vector = canvas.ravel()
+        vector -= vector.mean()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def classify(self, glyphs: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """
+        Nearest template for each glyph.
+
+        The confidence is the correlation with the best template, or 0 when a
+        template of a different digit scores within MIN_DIGIT_MARGIN of it.
+        """
+        self.ensure_loaded()
+        if not glyphs or not self.template_labels:
+            return []
+        vectors = np.array([self.glyph_vector(g) for g in glyphs], dtype=np.float32)
+        scores = vectors @ self.templates.T
+        labels = np.array(self.template_labels)
+
+        results = []
+        for glyph_scores in scores:
+            best = int(glyph_scores.argmax())
+            label = labels[best]
+            others = glyph_scores[labels != label]
+            runner_up = float(others.max()) if others.size else -1.0
+            score = float(glyph_scores[best])
+            results.append((str(label), score if score - runner_up >= MIN_DIGIT_MARGIN else 0.0))
+        return results
+
+    def recognize(self, image: np.ndarray) -> Tuple[Optional[str], float]:
+        """
+        Read the number in a stat cell.
+
+        Returns:
+            (text, confidence), where confidence is the score of the weakest glyph.
+            text is None when the cell could not be segmented or no templates exist.
+        """
+        glyphs = self.segment(self.binarize(image))
+        results = self.classify(glyphs)
+        if not results:
+            return None, 0.0
+        text = ''.join(label for label, _ in results)
+        return text, min(score for _, score in results)
+
+    def add_template(self, glyph: np.ndarray, label: str) -> Optional[str]:
+        """Store a binary glyph mask as a template, skipping exact duplicates"""
+        os.makedirs(self.template_folder, exist_ok=True)
+        # Stored as black on white with a margin, like the cells
+        glyph = cv2.copyMakeBorder(cv2.bitwise_not(glyph), 2, 2, 2, 2, cv2.BORDER_CONSTANT, value=255)
+        digest = hashlib.sha1(glyph.tobytes() + str(glyph.shape).encode()).hexdigest()[:12]
+        path = os.path.join(self.template_folder, f"{label}_{digest}.png")
+        if os.path.exists(path):
+            return None
+        cv2.imwrite(path, glyph)
+        return path
+
+
+# Global instance for use in other modules
+digit_recognizer = DigitRecognizer()
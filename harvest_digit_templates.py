@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Digit Template Harvester
+Builds the digit templates used by digit_recognition from labelled screenshots.
+
+The labels file is a semicolon separated CSV with one line per player row:
+
+    filename;row;acs;kills;deaths;assists;econ;first_bloods;plants;defuses
+
+where row is the 1-based row number on the scoreboard. Every stat cell whose
+glyph count matches its label is split into glyphs that are saved to the
+template folder as '<digit>_<id>.png'.
+"""
+
+import argparse
+import csv
+import os
+import sys
+from collections import Counter, defaultdict
+
+from digit_recognition import DigitRecognizer
+from ingest import load_screenshot
+from ocr_library import functions as srf
+
+# Glyphs that already match an existing template this well add nothing new
+DUPLICATE_SCORE = 0.97
+
+
+def read_labels(labels_path):
+    labels = defaultdict(dict)
+    with open(labels_path, newline='', encoding='utf-8') as f:
+        for line in csv.reader(f, delimiter=';'):
+            if len(line) < 3 or not line[1].strip().isdigit():
+                continue  # Header or malformed line
+            filename, row = line[0].strip(), int(line[1])
+            labels[filename][row] = [value.strip() for value in line[2:]]
+    return labels
+
+
+def harvest(screenshot_folder, labels_path, template_folder, max_per_digit):
+    recognizer = DigitRecognizer(template_folder)
+    recognizer.ensure_loaded()
+    stored = Counter(recognizer.template_labels)
+    labels = read_labels(labels_path)
+
+    for filename, rows in sorted(labels.items()):
+        file_path = os.path.join(screenshot_folder, filename)
+        try:
+            image, image_colored, _ = load_screenshot(file_path)
+        except ValueError:
+            print(f"Skipping {filename}: could not read image")
+            continue
+
+        try:
+            cell_images_rows, _ = srf.detect_table_cells(image, image_colored)
+        except Exception as e:
+            print(f"Skipping {filename}: table not found ({e})")
+            continue
+
+        for row_number, values in sorted(rows.items()):
+            if row_number > len(cell_images_rows):
+                continue
+            _, crops = srf.prepare_row(cell_images_rows[row_number - 1][0])
+            if crops is None:
+                print(f"Skipping {filename} row {row_number}: stat cells not found")
+                continue
+            if len(crops) != len(values):
+                print(f"Skipping {filename} row {row_number}: found {len(crops)} cells, labelled {len(values)}")
+                continue
+
+            for cropped, value in zip(crops, values):
+                glyphs = recognizer.segment(recognizer.binarize(cropped))
+                if len(glyphs) != len(value) or not value.isdigit():
+                    continue
+                for glyph, digit in zip(glyphs, value):
+                    if stored[digit] >= max_per_digit:
+                        continue
+                    if recognizer.template_labels:
+                        (label, score), = recognizer.classify([glyph])
+                        if label == digit and score >= DUPLICATE_SCORE:
+                            continue
+                    if recognizer.add_template(glyph, digit):
+                        stored[digit] += 1
+                        recognizer.reload()
+
+    print("Templates per digit: " + ", ".join(f"{d}={stored[d]}" for d in "0123456789"))
+    missing = [d for d in "0123456789" if stored[d] == 0]
+    if missing:
+        print(f"No templates yet for: {', '.join(missing)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Harvest digit templates from labelled scoreboard screenshots")
+    parser.add_argument('screenshots', help="Folder containing the labelled screenshots")
+    parser.add_argument('labels', help="Semicolon separated labels file")
+    parser.add_argument('--templates', default='./digit-templates', help="Template folder to write to")
+    parser.add_argument('--max-per-digit', type=int, default=30, help="Maximum number of templates per digit")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.screenshots):
+        print(f"Screenshot folder not found: {args.screenshots}")
+        sys.exit(1)
+    harvest(args.screenshots, args.labels, args.templates, args.max_per_digit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Ingest Module
+Brings every screenshot to the working resolution the scoreboard pipeline is
+tuned for (1080p), so its pixel constants hold and its cost stays fixed.
+"""
+
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+# Height every screenshot is scaled to, the pixel constants of the pipeline
+# (map banner region, cell kernels, headshot offset) are measured at 1080p
+CANONICAL_HEIGHT = 1080
+
+
+def normalize_resolution(image: np.ndarray, height: int = CANONICAL_HEIGHT) -> Tuple[np.ndarray, float]:
+    """
+    Scale an image to the working height, keeping its aspect ratio.
+
+    A 16:9 screenshot becomes 1920x1080. Other aspect ratios keep their shape,
+    since the game scales its interface with the screen height.
+
+    Returns:
+        (image, scale) where scale is working size / source size. Images that
+        already have the working height are returned unchanged with scale 1.0.
+    """
+    source_height, source_width = image.shape[:2]
+    if source_height == height:
+        return image, 1.0
+
+    scale = height / source_height
+    width = max(1, int(round(source_width * scale)))
+    # INTER_AREA averages all source pixels when shrinking, linear is enough to enlarge
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    return cv2.resize(image, (width, height), interpolation=interpolation), scale
+
+
+def normalize_screenshot(image_colored: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Normalize a color screenshot and derive its grayscale version.
+
+    The color image is resized once and the grayscale image is converted from
+    the working size result, so no full resolution grayscale copy is made.
+
+    Returns:
+        (image, image_colored, scale) with the grayscale and color images at the working size.
+    """
+    image_colored, scale = normalize_resolution(image_colored)
+    image = cv2.cvtColor(image_colored, cv2.COLOR_BGR2GRAY)
+    return image, image_colored, scale
+
+
+def decode_screenshot(data: bytes) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Decode an encoded screenshot (PNG/JPEG bytes) once and normalize it.
+
+    The grayscale version is derived from the normalized color image instead of
+    decoding the file a second time.
+
+    Returns:
+        (image, image_colored, scale) as returned by normalize_screenshot.
+
+    Raises:
+        ValueError: If the bytes are not a readable image.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    image_colored = cv2.imdecode(buffer, cv2.IMREAD_COLOR) if buffer.size else None
+    if image_colored is None:
+        raise ValueError("could not read image")
+    return normalize_screenshot(image_colored)
+
+
+def load_screenshot(path: str) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Read a screenshot file with decode_screenshot"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        raise ValueError(f"could not read image: {e}") from e
+    return decode_screenshot(data)
+
@@ -0,0 +1,126 @@
+"""
+Jobs Module
+Runs screenshot batches in background threads so uploads return at once,
+and keeps per-file progress and the final result of each batch for polling.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Batches processed at the same time, each one reads its rows with ROW_WORKERS threads
+JOB_WORKERS = 2
+# Seconds a finished job stays available for polling
+JOB_TTL = 3600
+
+# process(filename, data) -> (rows, error message, details added to the file's progress)
+ProcessFunction = Callable[[str, bytes], Tuple[Optional[List], Optional[str], Dict]]
+# summarize(file results, rows of all files) -> final result
+SummarizeFunction = Callable[[List[Dict], List], Dict]
+
+
+class Job:
+    """One uploaded batch: its files, their progress and the final result"""
+
+    def __init__(self, files: List[Tuple[str, bytes]]):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued'
+        self.created = time.time()
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.files = [{'filename': filename, 'status': 'queued'} for filename, _ in files]
+        self._data = [data for _, data in files]
+
+    @property
+    def processed(self) -> int:
+        return sum(1 for f in self.files if f['status'] in ('success', 'error'))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'total': len(self.files),
+            'processed': self.processed,
+            'files': [dict(f) for f in self.files],
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class JobManager:
+    """Thread pool running Jobs, with lookup by job id until JOB_TTL after they finish"""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, ttl: float = JOB_TTL):
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, files: List[Tuple[str, bytes]], process: ProcessFunction, summarize: SummarizeFunction) -> Job:
+        """
+        Queue a batch of (filename, encoded image) pairs.
+
+        Each file is passed to process() with its filename in upload order, then summarize() builds
+        the job result from the per-file results and the rows of all files.
+        """
+        job = Job(files)
+        with self._lock:
+            self._purge()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, process, summarize)
+        logging.info(f"Queued job {job.id} with {len(files)} files")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def _purge(self):
+        """Drop finished jobs older than the TTL, must be called with the lock held"""
+        expired = time.time() - self.ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished is not None and job.finished < expired]:
+            del self._jobs[job_id]
+
+    def _run(self, job: Job, process: ProcessFunction, summarize: SummarizeFunction):
+        job.status = 'running'
+        all_rows = []
+        try:
+            for i, file_result in enumerate(job.files):
+                file_result['status'] = 'processing'
+                try:
+                    rows, error, details = process(file_result['filename'], job._data[i])
+                except Exception as e:
+                    rows, error, details = None, f"Error processing screenshot: {str(e)}", {}
+                # The encoded image is not needed any more
+                job._data[i] = None
+
+                file_result.update(details)
+                if error:
+                    file_result['error'] = error
+                    file_result['status'] = 'error'
+                else:
+                    file_result['raw_count'] = len(rows)
+                    file_result['status'] = 'success'
+                    all_rows.extend(rows)
+
+            job.result = summarize([dict(f) for f in job.files], all_rows)
+            job.status = 'done'
+        except Exception as e:
+            logging.exception(f"Job {job.id} failed")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+        logging.info(f"Job {job.id} {job.status} after {job.finished - job.created:.1f}s")
+
+
+# Global instance for use in other modules
+job_manager = JobManager()
@@ -0,0 +1,178 @@
+"""
+Layout Profiles Module
+Remembers where the scoreboard table and its rows are for each screenshot
+resolution, so the morphological table detection only runs once per resolution.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# A full scoreboard has one row per player
+EXPECTED_ROWS = 10
+# Half height of the band searched around each expected row boundary
+BOUNDARY_BAND = 8
+# Distance in pixels a boundary line may be off from its stored position
+BOUNDARY_TOLERANCE = 3
+# Fraction of a band line that must be edge pixels to count as a boundary
+BOUNDARY_MIN_FILL = 0.5
+# How much fuller than the band median a boundary line must be (rules out texture)
+BOUNDARY_MIN_CONTRAST = 0.25
+# Fraction of row boundaries that must be found for the profile to fit
+MIN_BOUNDARY_MATCH = 0.9
+
+Rect = Tuple[int, int, int, int]
+
+
+def get_base_path():
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def profile_name(width: int, height: int) -> str:
+    return f"{width}x{height}"
+
+
+class LayoutProfiles:
+    """
+    Table and cell rectangles per screenshot resolution, stored as JSON.
+
+    A profile holds the table rectangle in screenshot coordinates and the cell
+    rectangles of every row in table coordinates (the headshot is the left
+    part of each cell). Stat cells are not stored: they are found from the
+    ink of each number, so their extents change with the digits shown.
+    """
+
+    def __init__(self, path: str = './layout-profiles.json'):
+        if not os.path.isabs(path):
+            path = os.path.join(get_base_path(), path)
+        self.path = path
+        self.profiles = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        self.profiles = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.profiles = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not read layout profiles from {self.path}: {e}")
+
+    def save(self):
+        # Unique per process, so processes saving at the same time do not share a temp file
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.profiles, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def get(self, width: int, height: int) -> Optional[Dict]:
+        with self._lock:
+            if self.profiles is None:
+                self.load()
+            return self.profiles.get(profile_name(width, height))
+
+    def learn(self, width: int, height: int, table_rect: Rect, rows: List[List[Rect]]) -> bool:
+        """
+        Store the layout of a successful detection, unless the resolution already has one.
+
+        Returns:
+            True if a new profile was saved.
+        """
+        if not self.is_complete(rows):
+            return False
+        name = profile_name(width, height)
+        with self._lock:
+            if self.profiles is None:
+                self.load()
+            if name in self.profiles:
+                return False
+            self.profiles[name] = {
+                'table': [int(v) for v in table_rect],
+                'rows': [[[int(v) for v in cell] for cell in row] for row in rows],
+            }
+            try:
+                self.save()
+            except OSError as e:
+                logging.warning(f"Could not save layout profiles to {self.path}: {e}")
+        logging.info(f"Learned scoreboard layout for {name}")
+        return True
+
+    def forget(self, width: int, height: int) -> bool:
+        """
+        Drop the stored layout of a resolution, so its table is detected and learned again.
+
+        Returns:
+            True if a profile was dropped.
+        """
+        with self._lock:
+            if self.profiles is None:
+                self.load()
+            if self.profiles.pop(profile_name(width, height), None) is None:
+                return False
+            self.save()
+        return True
+
+    @staticmethod
+    def is_complete(rows: List[List[Rect]]) -> bool:
+        """A detection is worth keeping when it found one cell for each of the 10 players"""
+        return len(rows) == EXPECTED_ROWS and all(len(row) == 1 for row in rows)
+
+    @staticmethod
+    def find_boundary(image: np.ndarray, position: int, start: int, length: int, vertical: bool = False) -> bool:
+        """
+        Checks for a line near a stored row boundary.
+
+        A horizontal line is searched near row `position`, from column `start` over
+        `length` pixels. With vertical=True, rows and columns are swapped.
+        """
+        if vertical:
+            image = image.T
+        top = max(0, position - BOUNDARY_BAND)
+        bottom = min(image.shape[0], position + BOUNDARY_BAND + 1)
+        band = np.ascontiguousarray(image[top:bottom, max(0, start):start + length])
+        if band.shape[0] < 3 or band.shape[1] == 0:
+            return False
+        # Same binarization the cell detection uses to find the row lines
+        band_bin = cv2.adaptiveThreshold(~band, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 13, -1)
+        fill = np.count_nonzero(band_bin, axis=1) / band.shape[1]
+        lo = max(0, position - BOUNDARY_TOLERANCE - top)
+        hi = min(band.shape[0], position + BOUNDARY_TOLERANCE + 1 - top)
+        if hi <= lo:
+            return False
+        line_fill = fill[lo:hi].max()
+        return bool(line_fill >= BOUNDARY_MIN_FILL and line_fill - np.median(fill) >= BOUNDARY_MIN_CONTRAST)
+
+    def verify(self, image: np.ndarray, profile: Dict) -> bool:
+        """
+        Checks that a grayscale screenshot has row boundaries where the profile expects them.
+        Only thin bands around the four edges of every stored row are binarized.
+        """
+        tx, ty, tw, th = profile['table']
+        img_h, img_w = image.shape[:2]
+        if tx < 0 or ty < 0 or tx + tw > img_w or ty + th > img_h:
+            return False
+
+        found = 0
+        checked = 0
+        for row in profile['rows']:
+            x, y, w, h = row[0]
+            x, y = tx + x, ty + y
+            for boundary in (y - 1, y + h):
+                checked += 1
+                found += self.find_boundary(image, boundary, x, w)
+            for boundary in (x - 1, x + w):
+                checked += 1
+                found += self.find_boundary(image, boundary, y, h, vertical=True)
+        return checked > 0 and found >= MIN_BOUNDARY_MATCH * checked
+
+
+# Global instance for use in other modules
+layout_profiles = LayoutProfiles()
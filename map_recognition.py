@@ -0,0 +1,169 @@
+"""
+Map Recognition Module
+Recognizes the map banner of a scoreboard screenshot by comparing a binary
+hash of the banner with the banners seen before, so OCR only runs for new ones.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Banner area of a 1080p screenshot (y1, y2, x1, x2)
+MAP_REGION = (60, 140, 60, 300)
+# Area from the top-left of the banner text that is hashed (width, height)
+TEXT_WINDOW = (224, 24)
+# The text window is shrunk to this size (width, height) before hashing
+HASH_SIZE = (48, 16)
+# Banners whose hashes differ in at most this fraction of bits show the same map
+MAX_HASH_DISTANCE = 0.04
+# Hashes kept per map, the oldest are dropped first
+MAX_HASHES_PER_MAP = 20
+# Similarity (difflib ratio) the OCR text of a banner needs to its map name to be indexed,
+# weaker reads are still returned but not remembered
+MIN_INDEX_RATIO = 0.9
+
+
+def get_base_path():
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def banner_region(image: np.ndarray) -> np.ndarray:
+    """Binarize only the map banner of a grayscale screenshot"""
+    y1, y2, x1, x2 = MAP_REGION
+    region = image[y1:y2, x1:x2]
+    _, binary = cv2.threshold(region, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def banner_hash(binary: np.ndarray) -> np.ndarray:
+    """Bit vector of a binarized banner"""
+    # Starting the window at the text makes the hash independent of small offsets
+    # of the banner. The window is not fitted to the text width, since that
+    # changes with the threshold and would stretch the whole hash.
+    window = np.zeros((TEXT_WINDOW[1], TEXT_WINDOW[0]), dtype=np.uint8)
+    points = cv2.findNonZero(binary)
+    if points is not None:
+        x, y, _, _ = cv2.boundingRect(points)
+        text = binary[y:y + TEXT_WINDOW[1], x:x + TEXT_WINDOW[0]]
+        window[:text.shape[0], :text.shape[1]] = text
+    small = cv2.resize(window, HASH_SIZE, interpolation=cv2.INTER_AREA)
+    return np.packbits(small.ravel() > 127)
+
+
+class MapIndex:
+    """Banner hashes of known maps, stored as JSON"""
+
+    def __init__(self, path: str = './map-index.json'):
+        if not os.path.isabs(path):
+            path = os.path.join(get_base_path(), path)
+        self.path = path
+        self.entries = None
+        self._names = []
+        self._hashes = None
+        self._lock = threading.Lock()
+
+    def _read_file(self) -> Dict[str, List[str]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not read map index from {self.path}: {e}")
+            return {}
+
+    def _rebuild(self):
+        names = []
+        hashes = []
+        for map_name, hex_hashes in self.entries.items():
+            for hex_hash in hex_hashes:
+                names.append(map_name)
+                hashes.append(np.frombuffer(bytes.fromhex(hex_hash), dtype=np.uint8))
+        self._names = names
+        hash_bytes = HASH_SIZE[0] * HASH_SIZE[1] // 8
+        self._hashes = np.array(hashes, dtype=np.uint8).reshape(len(hashes), hash_bytes)
+
+    def ensure_loaded(self):
+        if self.entries is None:
+            self.entries = self._read_file()
+            self._rebuild()
+
+    def save(self, dropped: Tuple[str, ...] = ()):
+        # Other processes may have added banners since this one loaded the file
+        for map_name, hex_hashes in self._read_file().items():
+            if map_name in dropped:
+                continue
+            known = self.entries.setdefault(map_name, [])
+            known[:0] = [h for h in hex_hashes if h not in known]
+        # Unique per process, so processes saving at the same time do not share a temp file
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+        self._rebuild()
+
+    def match(self, binary: np.ndarray, maps: List[str]) -> Optional[str]:
+        """
+        The map whose stored banner is closest to this one, if it is close enough.
+        Only maps in `maps` (the configured map pool) are returned.
+        """
+        query = banner_hash(binary)
+        with self._lock:
+            self.ensure_loaded()
+            if not self._names:
+                return None
+            distances = np.unpackbits(self._hashes ^ query, axis=1).sum(axis=1)
+            names = self._names
+
+        max_bits = MAX_HASH_DISTANCE * HASH_SIZE[0] * HASH_SIZE[1]
+        for i in np.argsort(distances, kind='stable'):
+            if distances[i] > max_bits:
+                break
+            if names[i] in maps:
+                return names[i]
+        return None
+
+    def add(self, binary: np.ndarray, map_name: str):
+        """Remember a banner that was read as map_name"""
+        hex_hash = banner_hash(binary).tobytes().hex()
+        with self._lock:
+            self.ensure_loaded()
+            known = self.entries.setdefault(map_name, [])
+            if hex_hash in known:
+                return
+            known.append(hex_hash)
+            del known[:-MAX_HASHES_PER_MAP]
+            try:
+                self.save()
+            except OSError as e:
+                logging.warning(f"Could not save map index to {self.path}: {e}")
+        logging.info(f"Added a new banner of {map_name} to the map index")
+
+    def forget(self, map_name: str) -> int:
+        """
+        Drop every stored banner of a map, so its banners are read with OCR again.
+        Used when banners of another map were stored under it.
+
+        Returns:
+            The number of banners dropped.
+        """
+        with self._lock:
+            self.ensure_loaded()
+            # Match the stored name case-insensitively, as the map pool does
+            names = [name for name in set(self.entries) | set(self._read_file()) if name.lower() == map_name.lower()]
+            dropped = sum(len(self.entries.pop(name, [])) for name in names)
+            self.save(dropped=tuple(names))
+        logging.info(f"Dropped {dropped} banners of {map_name} from the map index")
+        return dropped
+
+
+# Global instance for use in other modules
+map_index = MapIndex()
@@ -0,0 +1,126 @@
+"""
+OCR Cache Module
+Content addressed cache of OCR results, so identical crops (the same player
+names across a scrim series) are only recognised once.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class OCRCache:
+    """
+    Size bounded in-memory LRU cache with an optional SQLite backing store.
+
+    Keys are SHA-1 digests of the preprocessed crop pixels plus everything that
+    influences the result (OCR config, language, mode). Values must be JSON
+    serialisable so they can be persisted.
+    """
+
+    def __init__(self, max_entries: int = 4096, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            self.enable_disk(db_path)
+
+    @staticmethod
+    def make_key(image: np.ndarray, *parts: str) -> str:
+        """Exact content hash of an image plus the settings used to read it"""
+        image = np.ascontiguousarray(image)
+        digest = hashlib.sha1()
+        digest.update(f"{image.shape}|{image.dtype}|".encode())
+        digest.update(image.tobytes())
+        digest.update('\0'.join(str(p) for p in parts).encode())
+        return digest.hexdigest()
+
+    def enable_disk(self, db_path: str):
+        """Persist entries to a SQLite database so they survive restarts"""
+        with self._lock:
+            db = sqlite3.connect(db_path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT value FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error as e:
+                    logging.warning(f"Could not read OCR cache entry: {e}")
+                    row = None
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO ocr_cache (key, value, created) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), time.time())
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logging.warning(f"Could not persist OCR cache entry: {e}")
+
+    def _remember(self, key: str, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters since start-up"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'disk': self._db is not None,
+            }
+
+    def clear(self):
+        """Drop the in-memory entries and reset the counters (the disk store is kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+
+# Global instance for use in other modules. Set OCR_CACHE_DB to a file path to
+# keep results between runs.
+ocr_cache = OCRCache(db_path=os.environ.get('OCR_CACHE_DB') or None)
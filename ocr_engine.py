@@ -0,0 +1,242 @@
+"""
+OCR Engine Module
+Keeps Tesseract loaded in-process for the life of the application instead of
+launching one tesseract subprocess (plus a temp image) per OCR call.
+"""
+
+import logging
+import os
+import shlex
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:  # Optional dependency, pytesseract is used instead
+    tesserocr = None
+
+# Engines kept per (tessdata, language, config) combination. Callers beyond this wait for
+# a free engine, multi-language engines with the CJK models take hundreds of MB each.
+MAX_ENGINES_PER_KEY = 2
+
+
+class TesseractEngine:
+    """A single loaded Tesseract instance for one language/config combination"""
+
+    def __init__(self, tessdata_path: str, lang: str, psm: Optional[int], oem: Optional[int], variables: Dict[str, str]):
+        kwargs = {'lang': lang, 'variables': variables}
+        if tessdata_path:
+            kwargs['path'] = tessdata_path
+        if psm is not None:
+            kwargs['psm'] = psm
+        if oem is not None:
+            kwargs['oem'] = oem
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        # OCREngine.clear() generation the engine was created in
+        self.generation = 0
+
+    def set_image(self, image: np.ndarray):
+        """Hand the raw pixel buffer to Tesseract without encoding it to a file"""
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+        # Channels are passed through unchanged, just like pytesseract does
+        # when it wraps an ndarray with PIL.
+        self.api.SetImageBytes(image.tobytes(), width, height, bytes_per_pixel, bytes_per_pixel * width)
+
+    def image_to_string(self, image: np.ndarray) -> str:
+        self.set_image(image)
+        return self.api.GetUTF8Text()
+
+    def image_to_data(self, image: np.ndarray) -> Dict[str, List]:
+        """Word level results in the same layout as pytesseract.Output.DICT"""
+        self.set_image(image)
+        self.api.Recognize()
+
+        data = {'text': [], 'conf': [], 'left': [], 'top': [], 'width': [], 'height': []}
+        level = tesserocr.RIL.WORD
+        iterator = self.api.GetIterator()
+        if iterator is None:
+            return data
+
+        for word in tesserocr.iterate_level(iterator, level):
+            try:
+                text = word.GetUTF8Text(level)
+            except RuntimeError:
+                # Raised for empty result iterators
+                continue
+            box = word.BoundingBox(level)
+            if box is None:
+                continue
+            x1, y1, x2, y2 = box
+            data['text'].append(text)
+            data['conf'].append(word.Confidence(level))
+            data['left'].append(x1)
+            data['top'].append(y1)
+            data['width'].append(x2 - x1)
+            data['height'].append(y2 - y1)
+        return data
+
+    def close(self):
+        self.api.End()
+
+
+class OCREngine:
+    """
+    Single OCR entry point for the whole application.
+
+    Engines are created lazily, one pool per (tessdata, language, config)
+    combination, and reused for every later call with the same settings.
+    A Tesseract instance is not thread safe, so each caller gets an engine
+    of its own. At most max_engines_per_key engines are created per pool,
+    further callers wait until one is released. When tesserocr is not
+    installed, or an engine cannot be created for a combination, calls go
+    through pytesseract.
+    """
+
+    def __init__(self, max_engines_per_key: int = MAX_ENGINES_PER_KEY):
+        self.prefer_in_process = True
+        self.max_engines_per_key = max_engines_per_key
+        # Idle engines per key, the most recently used last
+        self._pools: Dict[Tuple, List[TesseractEngine]] = {}
+        # Engines created per key, idle or in use
+        self._created: Dict[Tuple, int] = {}
+        self._unavailable = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    @property
+    def in_process_available(self) -> bool:
+        return tesserocr is not None and self.prefer_in_process
+
+    @staticmethod
+    def parse_config(config: str) -> Optional[Tuple[Optional[int], Optional[int], Dict[str, str]]]:
+        """
+        Translate a tesseract command line config into engine settings.
+
+        Returns:
+            (psm, oem, variables), or None if the config contains options that
+            only the tesseract executable understands.
+        """
+        psm = None
+        oem = None
+        variables = {}
+        # Same splitting rules as pytesseract uses on POSIX
+        tokens = shlex.split(config or '')
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token in ('--psm', '--oem') and i + 1 < len(tokens):
+                try:
+                    value = int(tokens[i + 1])
+                except ValueError:
+                    return None
+                if token == '--psm':
+                    psm = value
+                else:
+                    oem = value
+                i += 2
+            elif token == '-c' and i + 1 < len(tokens) and '=' in tokens[i + 1]:
+                key, value = tokens[i + 1].split('=', 1)
+                variables[key] = value
+                i += 2
+            else:
+                return None
+        return psm, oem, variables
+
+    def _pool_key(self, config: str, lang: str) -> Tuple[str, str, str]:
+        return os.environ.get('TESSDATA_PREFIX', ''), lang or 'eng', config or ''
+
+    def _acquire(self, key: Tuple[str, str, str]) -> Optional[TesseractEngine]:
+        if not self.in_process_available:
+            return None
+
+        with self._lock:
+            while True:
+                if key in self._unavailable:
+                    return None
+                idle = self._pools.setdefault(key, [])
+                if idle:
+                    return idle.pop()
+                if self._created.get(key, 0) < self.max_engines_per_key:
+                    # Reserve the slot, the engine is loaded outside the lock
+                    self._created[key] = self._created.get(key, 0) + 1
+                    generation = self._generation
+                    break
+                self._released.wait()
+
+        settings = self.parse_config(key[2])
+        engine = None
+        if settings is not None:
+            psm, oem, variables = settings
+            try:
+                engine = TesseractEngine(key[0], key[1], psm, oem, variables)
+                engine.generation = generation
+            except Exception as e:
+                logging.warning(f"In-process Tesseract unavailable for lang={key[1]!r} config={key[2]!r}, using pytesseract: {e}")
+        if engine is None:
+            with self._lock:
+                self._unavailable.add(key)
+                if generation == self._generation:
+                    self._created[key] -= 1
+                # Waiting callers fall back to pytesseract as well
+                self._released.notify_all()
+        return engine
+
+    def _release(self, key: Tuple[str, str, str], engine: TesseractEngine):
+        with self._lock:
+            if engine.generation == self._generation:
+                self._pools.setdefault(key, []).append(engine)
+                self._released.notify()
+                return
+        # Created before clear(), not counted in the current pools any more
+        engine.close()
+
+    def image_to_string(self, image: np.ndarray, config: str = '', lang: str = '') -> str:
+        """Drop-in replacement for pytesseract.image_to_string"""
+        key = self._pool_key(config, lang)
+        engine = self._acquire(key)
+        if engine is None:
+            return pytesseract.image_to_string(image, config=config, lang=lang or None)
+        try:
+            return engine.image_to_string(image)
+        finally:
+            self._release(key, engine)
+
+    def image_to_data(self, image: np.ndarray, config: str = '', lang: str = '') -> Dict[str, List]:
+        """Drop-in replacement for pytesseract.image_to_data with Output.DICT"""
+        key = self._pool_key(config, lang)
+        engine = self._acquire(key)
+        if engine is None:
+            return pytesseract.image_to_data(
+                image,
+                config=config,
+                lang=lang or None,
+                output_type=pytesseract.Output.DICT
+            )
+        try:
+            return engine.image_to_data(image)
+        finally:
+            self._release(key, engine)
+
+    def clear(self):
+        """Unload every cached engine, e.g. after the tessdata location changed"""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+            self._created = {}
+            self._unavailable = set()
+            # Engines in use are closed when they are released
+            self._generation += 1
+            self._released.notify_all()
+        for idle in pools:
+            for engine in idle:
+                engine.close()
+
+
+# Global instance for use in other modules
+ocr_engine = OCREngine()
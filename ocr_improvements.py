@@ -4,10 +4,13 @@ Enhanced OCR processing for better leet speak detection and highlighted player r
 """
 
 import re
+import threading
 import cv2
 import numpy as np
-from typing import Dict, List, Tuple
-import pytesseract
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from ocr_engine import ocr_engine
+from ocr_cache import ocr_cache
 
 class EnhancedOCR:
     """Enhanced OCR with leet speak detection and highlighted player recognition"""
@@ -67,6 +70,24 @@ class EnhancedOCR:
             '--psm 8 -c tessedit_char_whitelist=abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789/_@!$+|()[]{}\\<>/-',
         ]
 
+        # Name OCR stops at the first configuration whose average word
+        # confidence reaches this value
+        self.name_confidence_threshold = 80
+
+        # Language sets for name OCR. Names that look Latin are read with
+        # English only and escalated to the full set when confidence stays
+        # below latin_accept_confidence
+        self.latin_langs = 'eng'
+        self.all_langs = 'eng+kor+jpn+chi_sim'
+        self.latin_accept_confidence = 60
+
+        # How often each configuration produced the accepted name, and how many
+        # engine calls each name needed
+        self.config_wins = Counter()
+        self.name_attempts = Counter()
+        self.lang_counts = Counter()
+        self._stats_lock = threading.Lock()
+
     def detect_highlighted_player(self, image_colored: np.ndarray, cell_row: List) -> Tuple[bool, np.ndarray]:
         """
         Detect if a player row is highlighted (yellow background in VALORANT)
@@ -134,60 +155,229 @@ class EnhancedOCR:
         
         return normalized
 
+    def detect_name_script(self, image: np.ndarray) -> str:
+        """
+        Cheap script guess for a processed name image from connected component statistics.
+        Returns 'latin', 'cjk' or 'empty'.
+
+        Latin letters are mostly one component each, side by side. Hangul, kana and
+        hanzi glyphs break into several strokes, many of them small and stacked
+        above each other within one character cell.
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+        _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # Background is whatever dominates the border
+        border = np.concatenate([mask[0, :], mask[-1, :], mask[:, 0], mask[:, -1]])
+        if np.count_nonzero(border) > border.size / 2:
+            mask = cv2.bitwise_not(mask)
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        img_h, img_w = mask.shape
+        boxes = []
+        for x, y, w, h, area in stats[1:]:
+            if area < 4:
+                continue
+            # The cell border and other lines cut by the crop edge are not part of the name
+            if x == 0 or y == 0 or x + w >= img_w or y + h >= img_h:
+                continue
+            # Neither are tall, very thin lines
+            if h > 5 * w:
+                continue
+            boxes.append((x, y, w, h))
+        # Outlined letters have their holes as separate components inside the letter, these
+        # are not strokes stacked in a character cell
+        boxes = [
+            (x1, y1, w1, h1) for i, (x1, y1, w1, h1) in enumerate(boxes)
+            if not any(
+                j != i and x2 <= x1 and y2 <= y1 and x1 + w1 <= x2 + w2 and y1 + h1 <= y2 + h2
+                for j, (x2, y2, w2, h2) in enumerate(boxes)
+            )
+        ]
+        if not boxes:
+            return 'empty'
+
+        # The median stroke, a single tall component would make every letter look small
+        line_height = float(np.median([h for _, _, _, h in boxes]))
+        # Ignore dots, commas and specks
+        strokes = [b for b in boxes if b[3] >= 0.25 * line_height]
+        if len(strokes) < 2:
+            return 'latin'
+
+        small = sum(1 for b in strokes if b[3] < 0.6 * line_height)
+        stacked = 0
+        for i, (x1, _, w1, _) in enumerate(strokes):
+            for j, (x2, _, w2, _) in enumerate(strokes):
+                if i != j and min(x1 + w1, x2 + w2) - max(x1, x2) > 0.5 * min(w1, w2):
+                    stacked += 1
+                    break
+
+        if stacked / len(strokes) > 0.3 or small / len(strokes) > 0.5:
+            return 'cjk'
+        return 'latin'
+
+    def name_language_sets(self, image: np.ndarray) -> List[str]:
+        """Language sets to try for a name, smallest first"""
+        if self.detect_name_script(image) == 'cjk':
+            return [self.all_langs]
+        return [self.latin_langs, self.all_langs]
+
+    def ordered_ocr_configs(self) -> List[str]:
+        """OCR configurations ordered by how often they produced the accepted name so far"""
+        with self._stats_lock:
+            # sorted() is stable, so the declared order breaks ties
+            return sorted(self.ocr_configs, key=lambda config: -self.config_wins[config])
+
+    def record_config_wins(self, configs: List[Optional[str]]):
+        """Count the configurations that produced accepted names, None entries are skipped"""
+        with self._stats_lock:
+            for config in configs:
+                if config is not None:
+                    self.config_wins[config] += 1
+
+    def name_ocr_report(self) -> Dict:
+        """Engine calls per name and winning configurations since start-up"""
+        with self._stats_lock:
+            names = sum(self.name_attempts.values())
+            calls = sum(attempts * count for attempts, count in self.name_attempts.items())
+            return {
+                'names': names,
+                'average_attempts': calls / names if names else 0,
+                'attempts_histogram': dict(sorted(self.name_attempts.items())),
+                'languages': dict(self.lang_counts),
+                'config_wins': {self.ocr_configs.index(c): n for c, n in self.config_wins.items()},
+            }
+
     def enhanced_ocr_name(self, image: np.ndarray, is_highlighted: bool = False) -> str:
         """
         Enhanced OCR for player names with leet speak support
         """
+        return self.enhanced_ocr_name_with_info(image, is_highlighted)[0]
+
+    def name_cache_key(self, image: np.ndarray, is_highlighted: bool = False) -> str:
+        """Cache key covering the crop and every setting that changes the name read from it"""
+        return ocr_cache.make_key(
+            image, 'name', is_highlighted, self.latin_langs, self.all_langs,
+            self.name_confidence_threshold, self.latin_accept_confidence, *self.ocr_configs
+        )
+
+    def enhanced_ocr_name_with_info(self, image: np.ndarray, is_highlighted: bool = False,
+                                    configs: Optional[List[str]] = None, record_win: bool = True) -> Tuple[str, Dict]:
+        """
+        Enhanced OCR for player names that stops at the first confident result.
+        Returns (name, info) where info holds the attempts, winning config and confidence.
+        Identical crops are answered from the OCR cache with 0 attempts.
+
+        configs is the configuration order to try, ordered_ocr_configs() when not given.
+        With record_win=False the winning configuration is not counted, so rows read at
+        the same time see the same order; the caller passes info['config'] to
+        record_config_wins() later.
+        """
+        key = self.name_cache_key(image, is_highlighted)
+        cached = ocr_cache.get(key)
+        if cached is not None:
+            name, info = cached
+            info = dict(info, attempts=0, cached=True)
+            with self._stats_lock:
+                self.name_attempts[0] += 1
+                if info['lang'] is not None:
+                    self.lang_counts[info['lang']] += 1
+            return name, info
+
+        name, info = self.read_name(image, is_highlighted, configs, record_win)
+        ocr_cache.put(key, [name, info])
+        return name, info
+
+    def read_name(self, image: np.ndarray, is_highlighted: bool = False,
+                  configs: Optional[List[str]] = None, record_win: bool = True) -> Tuple[str, Dict]:
+        """Runs the name OCR configurations on a crop, bypassing the cache"""
         best_result = ""
         best_confidence = 0
-        
-        # Try multiple OCR configurations
-        for config in self.ocr_configs:
-            try:
-                # Get OCR result with confidence
-                data = pytesseract.image_to_data(
-                    image, 
-                    config=config, 
-                    lang='eng+kor+jpn+chi_sim',
-                    output_type=pytesseract.Output.DICT
-                )
-                
-                # Extract text and calculate average confidence
-                words = []
-                confidences = []
-                
-                for i, word in enumerate(data['text']):
-                    if word.strip() and int(data['conf'][i]) > 30:  # Minimum confidence threshold
-                        words.append(word.strip())
-                        confidences.append(int(data['conf'][i]))
-                
-                if words and confidences:
-                    result_text = ' '.join(words)
-                    avg_confidence = sum(confidences) / len(confidences)
+        best_raw_confidence = 0
+        best_config = None
+        best_lang = None
+        attempts = 0
+        if configs is None:
+            configs = self.ordered_ocr_configs()
+
+        lang_sets = self.name_language_sets(image)
+        for lang in lang_sets:
+            # A Latin-only read that is confident enough needs no CJK models
+            if best_lang is not None and best_raw_confidence >= self.latin_accept_confidence:
+                break
+            for config in configs:
+                attempts += 1
+                try:
+                    # Get OCR result with confidence
+                    data = ocr_engine.image_to_data(
+                        image, 
+                        config=config, 
+                        lang=lang
+                    )
+                    
+                    # Extract text and calculate average confidence
+                    words = []
+                    confidences = []
                     
-                    # Bonus for highlighted players (they're usually more important)
-                    if is_highlighted:
-                        avg_confidence += 10
+                    for i, word in enumerate(data['text']):
+                        confidence = float(data['conf'][i])
+                        if str(word).strip() and confidence > 30:  # Minimum confidence threshold
+                            words.append(str(word).strip())
+                            confidences.append(confidence)
                     
-                    if avg_confidence > best_confidence:
-                        best_confidence = avg_confidence
-                        best_result = result_text
+                    if words and confidences:
+                        result_text = ' '.join(words)
+                        raw_confidence = sum(confidences) / len(confidences)
+                        avg_confidence = raw_confidence
                         
-            except Exception as e:
-                continue
+                        # Bonus for highlighted players (they're usually more important)
+                        if is_highlighted:
+                            avg_confidence += 10
+                        
+                        if avg_confidence > best_confidence:
+                            best_confidence = avg_confidence
+                            best_raw_confidence = raw_confidence
+                            best_result = result_text
+                            best_config = config
+                            best_lang = lang
+                            
+                except Exception as e:
+                    continue
+
+                # Good enough, skip the remaining configurations
+                if best_raw_confidence >= self.name_confidence_threshold:
+                    break
         
         # If no good result, try basic OCR
         if not best_result or best_confidence < 40:
+            attempts += 1
+            basic_lang = lang_sets[-1]
             try:
-                basic_result = pytesseract.image_to_string(
+                basic_result = ocr_engine.image_to_string(
                     image, 
                     config=self.ocr_configs[0], 
-                    lang='eng+kor+jpn+chi_sim'
+                    lang=basic_lang
                 ).strip()
                 if basic_result:
+                    # Only credit the basic call when it produced the returned text
                     best_result = basic_result
+                    best_config = None
+                    best_lang = basic_lang
             except:
                 pass
+
+        with self._stats_lock:
+            self.name_attempts[attempts] += 1
+            # No language read anything when best_lang is None
+            if best_lang is not None:
+                self.lang_counts[best_lang] += 1
+            if record_win and best_config is not None:
+                self.config_wins[best_config] += 1
+        info = {
+            'attempts': attempts,
+            'config': best_config,
+            'confidence': best_raw_confidence,
+            'lang': best_lang,
+        }
         
         # Clean up the result
         if best_result:
@@ -200,9 +390,9 @@ class EnhancedOCR:
             
             # Return both original and normalized if they're different
             if normalized != best_result.lower() and len(normalized) > 2:
-                return f"{best_result} ({normalized})"
+                return f"{best_result} ({normalized})", info
             
-        return best_result if best_result else "err"
+        return (best_result if best_result else "err"), info
 
     def preprocess_name_image(self, image: np.ndarray, is_highlighted: bool = False) -> np.ndarray:
         """
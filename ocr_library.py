@@ -4,18 +4,53 @@ Code has been optimised for reading screenshots of final scoreboard in the game
 Lots of code is utilised from https://github.com/eihli/image-table-ocr#org67b1fc2
 '''
 import csv
+import os
 import math
 import difflib
+import heapq
 import cv2
 import numpy as np
 import pytesseract
 import logging
-from agent_recognition import find_matching_agent, load_images_from_folder
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from agent_recognition import get_agent_index
 from ocr_improvements import enhanced_ocr
+from ocr_engine import ocr_engine
+from ocr_cache import ocr_cache
+from digit_recognition import digit_recognizer
+from layout_profiles import layout_profiles, EXPECTED_ROWS
+from map_recognition import map_index, banner_region, MIN_INDEX_RATIO
 
 #Setting up tesseract - only needs this if you have directly installed tesseract (I think).
 pytesseract.pytesseract.tesseract_cmd = "tesseract"
 
+#Tesseract settings for the numeric stat cells
+DIGIT_CELL_OCR_CONFIG = '-c tessedit_char_whitelist=0123456789 --psm 7'
+#Composite mode reads a whole grid of cells, so it uses block segmentation
+COMPOSITE_OCR_CONFIG = '-c tessedit_char_whitelist=0123456789 --psm 6'
+#Minimum blank space between tiles of the composite canvas, in pixels
+COMPOSITE_MIN_GAP = 40
+#Stat cells whose weakest glyph matches its digit template worse than this go to Tesseract
+DIGIT_TEMPLATE_MIN_CONFIDENCE = 0.85
+#Name area of a player row (x, y, width, height) at the row's original size
+NAME_ROI = (0, 0, 300, 100)
+#Scale the name and stat cell regions are processed at by prepare_row
+NAME_ROI_SCALE = 3
+CELL_ROI_SCALE = 2
+#Number of stat columns of a player row
+STAT_COLUMNS = 8
+#Stat cells start right of this fraction of the row width
+STAT_AREA_START = 0.24
+#Ink columns closer than this fraction of the row width belong to the same number
+STAT_GLYPH_GAP = 0.01
+#Columns of ink with fewer pixels than this are noise
+STAT_MIN_INK = 10
+#Blank margin kept around the digits of a stat cell, in pixels
+STAT_CELL_PADDING = 5
+#Rows read at once by read_table_rows in the applications
+ROW_WORKERS = min(4, os.cpu_count() or 1)
+
 
 class functions:
 
@@ -24,26 +59,54 @@ class functions:
         closest_match = difflib.get_close_matches(ocr_result, possible_names, n=1, cutoff=0.5)
         return closest_match[0] if closest_match else "Unknown"
 
-    def find_map_name(image, maps):
+    def find_map_name(image, maps, use_index=True):
         """
         Recognizes the map name from a VALORANT scoreboard screenshot.
 
+        The banner is looked up in the map index first, OCR only runs for
+        banners that are not in it yet. Banners whose OCR text matches a map
+        name with at least MIN_INDEX_RATIO similarity are added to the index.
+
         Args:
             image: Preprocessed OpenCV image.
+            maps: Map names from the configuration.
+            use_index: Set to False to always read the banner with OCR.
 
         Returns:
             str: Recognized map name or "Unknown" if not found.
         """
-        # Apply thresholding to enhance text visibility
-        _, thresh = cv2.threshold(image, 150, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # Only the banner area is thresholded, with its own Otsu level
+        map_region = banner_region(image)
+
+        if use_index:
+            map_name = map_index.match(map_region, maps)
+            if map_name is not None:
+                return map_name
+
+        map_text = functions.read_map_text(map_region)
+        map_name = functions.get_most_similar(map_text, maps)
+        if use_index and map_name != "Unknown":
+            # A loose fuzzy match is good enough for this screenshot, but stored in the
+            # index it would recognize every later banner that looks like it
+            if difflib.SequenceMatcher(None, map_text, map_name).ratio() >= MIN_INDEX_RATIO:
+                map_index.add(map_region, map_name)
+            else:
+                logging.info(f"Map banner read as '{map_text}', using {map_name} without indexing it")
+        return map_name
+
+    def read_map_text(map_region):
+        """
+        Reads the text of the binarized banner with OCR.
 
-        # Define a region where the map name is typically located (top-left area)
-        map_region = thresh[60:140, 60:300]  # Adjusted for standard VALORANT scoreboard
+        Args:
+            map_region: Binarized banner from map_recognition.banner_region.
 
+        Returns:
+            str: The map name as read, capitalized, without the "MAP -" prefix.
+        """
         # Use Tesseract OCR to extract text
         custom_config = r'--psm 6'  # PSM 6 treats text as a block
-        extracted_text = pytesseract.image_to_string(map_region, config=custom_config, lang='eng')
-        # print(f"OCR Extracted Text: '{extracted_text.strip()}'") Debug Prints
+        extracted_text = ocr_engine.image_to_string(map_region, config=custom_config, lang='eng')
 
         # Process extracted text and find a valid map name
         # Remove newlines
@@ -51,53 +114,86 @@ class functions:
         # Extract only the last word after "MAP - "
         if "MAP -" in extracted_map_name:
             extracted_map_name = extracted_map_name.split("MAP -")[-1].strip()
-         # print(f"Extracted Map Name: '{extracted_map_name}'") Debug Prints
 
-        # Apply fuzzy matching to correct OCR errors
-        corrected_map_name = functions.get_most_similar(extracted_map_name.capitalize(), maps)
-        # print(f"Corrected Map Name: '{corrected_map_name}'") Debug Prints
+        return extracted_map_name.capitalize()
 
-        return corrected_map_name
+    def line_buffers(shape):
+        """
+        Allocates the working images of the table and cell line detection.
 
-    def find_tables(image, image_colored):
+        Returns:
+        buffers (list): Four uint8 arrays of the given shape, for the inverted
+                        image, the binary image and the horizontal and vertical lines.
         """
-        Given an input image, detects and extracts tables from the image.
+        return [np.empty(shape[:2], dtype=np.uint8) for _ in range(4)]
+
+    def line_mask(inverted, block_size, subtract_from_mean, scale, horizontal_dilation, vertical_dilation, buffers):
+        """
+        Finds the long horizontal and vertical lines of an inverted grayscale image.
+
+        Every intermediate image is written into the given buffers instead of
+        a new array, so ROI views of larger buffers can be passed.
 
         Parameters:
-        image (numpy.ndarray): Input image
+        inverted (numpy.ndarray): The inverted grayscale image.
+        block_size (int): Block size of the adaptive threshold.
+        subtract_from_mean (int): Constant of the adaptive threshold.
+        scale (int): Lines must be at least 1/scale of the image size long.
+        horizontal_dilation (int): Width the horizontal lines are dilated with.
+        vertical_dilation (int): Height the vertical lines are dilated with.
+        buffers (list): Three arrays shaped like the image (binary, horizontal, vertical).
 
         Returns:
-        tables (List[numpy.ndarray]): List of extracted tables
+        mask (numpy.ndarray): Nonzero on the lines, stored in the horizontal buffer.
+        """
+        img_bin, horizontal, vertical = buffers
+        MAX_COLOR_VAL = 255
+        cv2.adaptiveThreshold(
+            inverted,
+            MAX_COLOR_VAL,
+            cv2.ADAPTIVE_THRESH_MEAN_C,
+            cv2.THRESH_BINARY,
+            block_size,
+            subtract_from_mean,
+            dst=img_bin,
+        )
+        image_width, image_height = img_bin.shape
+        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (int(image_width / scale), 1))
+        cv2.morphologyEx(img_bin, cv2.MORPH_OPEN, horizontal_kernel, dst=horizontal)
+        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, int(image_height / scale)))
+        cv2.morphologyEx(img_bin, cv2.MORPH_OPEN, vertical_kernel, dst=vertical)
+
+        cv2.dilate(horizontal, cv2.getStructuringElement(cv2.MORPH_RECT, (horizontal_dilation, 1)), dst=horizontal)
+        cv2.dilate(vertical, cv2.getStructuringElement(cv2.MORPH_RECT, (1, vertical_dilation)), dst=vertical)
+
+        # Contours only depend on which pixels are set, so a saturating add is fine
+        return cv2.add(horizontal, vertical, dst=horizontal)
+
+    def detect_table_rect(image, buffers=None):
+        """
+        Given an input image, detects the scoreboard table in it.
+
+        Parameters:
+        image (numpy.ndarray): Input grayscale image
+        buffers (list): Optional working images from line_buffers, shaped like the image.
+
+        Returns:
+        rect (tuple): The (x, y, w, h) rectangle of the table
 
         """
+        if buffers is None:
+            buffers = functions.line_buffers(image.shape)
         BLUR_KERNEL_SIZE = (3, 3)
         STD_DEV_X_DIRECTION = 0
         STD_DEV_Y_DIRECTION = 0
-        blurred = cv2.GaussianBlur(image, BLUR_KERNEL_SIZE, STD_DEV_X_DIRECTION, STD_DEV_Y_DIRECTION)
-        MAX_COLOR_VAL = 255
+        inverted = buffers[0]
+        cv2.GaussianBlur(image, BLUR_KERNEL_SIZE, STD_DEV_X_DIRECTION, dst=inverted, sigmaY=STD_DEV_Y_DIRECTION)
+        cv2.bitwise_not(inverted, dst=inverted)
         BLOCK_SIZE = 15
         SUBTRACT_FROM_MEAN = -2
-
-        img_bin = cv2.adaptiveThreshold(
-            ~blurred,
-            MAX_COLOR_VAL,
-            cv2.ADAPTIVE_THRESH_MEAN_C,
-            cv2.THRESH_BINARY,
-            BLOCK_SIZE,
-            SUBTRACT_FROM_MEAN,
-        )
-        vertical = horizontal = img_bin.copy()
         SCALE = 5
-        image_width, image_height = horizontal.shape
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (int(image_width / SCALE), 1))
-        horizontally_opened = cv2.morphologyEx(img_bin, cv2.MORPH_OPEN, horizontal_kernel)
-        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, int(image_height / SCALE)))
-        vertically_opened = cv2.morphologyEx(img_bin, cv2.MORPH_OPEN, vertical_kernel)
-
-        horizontally_dilated = cv2.dilate(horizontally_opened, cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1)))
-        vertically_dilated = cv2.dilate(vertically_opened, cv2.getStructuringElement(cv2.MORPH_RECT, (1, 60)))
 
-        mask = horizontally_dilated + vertically_dilated
+        mask = functions.line_mask(inverted, BLOCK_SIZE, SUBTRACT_FROM_MEAN, SCALE, 40, 60, buffers[1:])
         contours, heirarchy = cv2.findContours(
             mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
         )
@@ -114,48 +210,42 @@ class functions:
         # A table should have a lot of intersections. We might have a rectangular image
         # here though which would only have 4 intersections, 1 at each corner.
         # Leaving that step as a future TODO if it is ever necessary.
-        images = [image[y:y+h, x:x+w] for x, y, w, h in bounding_rects]
-        images_colored = [image_colored[y:y+h, x:x+w] for x, y, w, h in bounding_rects]
-        return images[0], images_colored[0]
+        return bounding_rects[0]
 
-    def extract_cell_images_from_table(image,image_colored):
+    def find_tables(image, image_colored):
         """
-        Extracts cell images from a table image.
+        Given an input image, detects and extracts tables from the image.
 
         Parameters:
-        image (numpy.ndarray): A table image.
+        image (numpy.ndarray): Input image
 
         Returns:
-        cell_images_rows (list): A list of lists containing numpy.ndarray representing cell images.
+        tables (List[numpy.ndarray]): List of extracted tables
+
         """
-        BLUR_KERNEL_SIZE = (1, 1)
-        STD_DEV_X_DIRECTION = 0
-        STD_DEV_Y_DIRECTION = 0
-        blurred = cv2.GaussianBlur(image, BLUR_KERNEL_SIZE, STD_DEV_X_DIRECTION, STD_DEV_Y_DIRECTION)
-        MAX_COLOR_VAL = 255
+        x, y, w, h = functions.detect_table_rect(image)
+        return image[y:y+h, x:x+w], image_colored[y:y+h, x:x+w]
+
+    def detect_row_rects(image, buffers=None):
+        """
+        Detects the cells of a table image, grouped into rows.
+
+        Parameters:
+        image (numpy.ndarray): A grayscale table image.
+        buffers (list): Optional working images from line_buffers, shaped like the image.
+
+        Returns:
+        rows (list): A list of rows ordered top to bottom, each a list of
+                     (x, y, w, h) cell rectangles ordered left to right.
+        """
+        if buffers is None:
+            buffers = functions.line_buffers(image.shape)
+        inverted = cv2.bitwise_not(image, dst=buffers[0])
         BLOCK_SIZE = 13
         SUBTRACT_FROM_MEAN = -1
-
-        img_bin = cv2.adaptiveThreshold(
-            ~blurred,
-            MAX_COLOR_VAL,
-            cv2.ADAPTIVE_THRESH_MEAN_C,
-            cv2.THRESH_BINARY,
-            BLOCK_SIZE,
-            SUBTRACT_FROM_MEAN,
-        )
-        vertical = horizontal = img_bin.copy()
         SCALE = 9
-        image_width, image_height = horizontal.shape
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (int(image_width / SCALE), 1))
-        horizontally_opened = cv2.morphologyEx(img_bin, cv2.MORPH_OPEN, horizontal_kernel)
-        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, int(image_height / SCALE)))
-        vertically_opened = cv2.morphologyEx(img_bin, cv2.MORPH_OPEN, vertical_kernel)
 
-        horizontally_dilated = cv2.dilate(horizontally_opened, cv2.getStructuringElement(cv2.MORPH_RECT, (1038, 1)))
-        vertically_dilated = cv2.dilate(vertically_opened, cv2.getStructuringElement(cv2.MORPH_RECT, (1, 60)))
-
-        mask = horizontally_dilated + vertically_dilated
+        mask = functions.line_mask(inverted, BLOCK_SIZE, SUBTRACT_FROM_MEAN, SCALE, 1038, 60, buffers[1:])
         contours, heirarchy = cv2.findContours(
             mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE,
         )
@@ -183,38 +273,98 @@ class functions:
         bounding_rects = [b for b in bounding_rects if b is not largest_rect]
 
         cells = [c for c in bounding_rects]
-        def cell_in_same_row(c1, c2):
-            c1_center = c1[1] + c1[3] - c1[3] / 2
-            c2_bottom = c2[1] + c2[3]
-            c2_top = c2[1]
-            return c2_top < c1_center < c2_bottom
+        rows = functions.group_cells_into_rows(cells)
+        return functions.check_rows(rows)
+
+    def group_cells_into_rows(cells):
+        """
+        Groups cell rectangles into rows with one sort on their vertical centre.
+
+        Walking the cells top to bottom, a cell joins the current row when its
+        centre lies inside the first cell of that row, otherwise it starts a new row.
+
+        Parameters:
+        cells (list): (x, y, w, h) cell rectangles in any order.
+
+        Returns:
+        rows (list): Rows ordered top to bottom, each a list of cells ordered left to right.
+        """
+        def center(cell):
+            return cell[1] + cell[3] / 2
 
-        orig_cells = [c for c in cells]
         rows = []
-        while cells:
-            first = cells[0]
-            rest = cells[1:]
-            cells_in_same_row = sorted(
-                [
-                    c for c in rest
-                    if cell_in_same_row(c, first)
-                ],
-                key=lambda c: c[0]
-            )
+        for cell in sorted(cells, key=center):
+            if rows:
+                first = rows[-1][0]
+                if first[1] < center(cell) < first[1] + first[3]:
+                    rows[-1].append(cell)
+                    continue
+            rows.append([cell])
+        return [sorted(row, key=lambda c: c[0]) for row in rows]
+
+    def check_rows(rows):
+        """
+        Removes fragments from detected table rows and reports unexpected layouts.
 
-            row_cells = sorted([first] + cells_in_same_row, key=lambda c: c[0])
-            rows.append(row_cells)
-            cells = [
-                c for c in rest
-                if not cell_in_same_row(c, first)
-            ]
+        A row split into several cells that together are no wider than the
+        widest cell is merged back into one cell. Remaining cells narrower than
+        half of the widest cell are fragments (a headshot box or a broken line)
+        that would otherwise be read as a player row. Rows whose height is far
+        from the median row height are dropped.
+
+        Parameters:
+        rows (list): Rows of (x, y, w, h) cell rectangles, as returned by group_cells_into_rows.
 
-        # Sort rows by average height of their center.
-        def avg_height_of_center(row):
-            centers = [y + h - h / 2 for x, y, w, h in row]
-            return sum(centers) / len(centers)
+        Returns:
+        rows (list): The rows without fragments.
+        """
+        if not rows:
+            logging.warning("No player rows found in the table")
+            return rows
+
+        widest = max(w for row in rows for _, _, w, _ in row)
+        merged = 0
+        for i, row in enumerate(rows):
+            if len(row) > 1:
+                x1 = min(x for x, _, _, _ in row)
+                y1 = min(y for _, y, _, _ in row)
+                x2 = max(x + w for x, _, w, _ in row)
+                y2 = max(y + h for _, y, _, h in row)
+                if x2 - x1 <= widest:
+                    rows[i] = [(x1, y1, x2 - x1, y2 - y1)]
+                    merged += 1
+
+        fragments = sum(1 for row in rows for _, _, w, _ in row if w < widest / 2)
+        rows = [[cell for cell in row if cell[2] >= widest / 2] for row in rows]
+        rows = [row for row in rows if row]
+
+        median_height = float(np.median([row[0][3] for row in rows]))
+        outliers = [row for row in rows if not 0.5 * median_height <= row[0][3] <= 1.5 * median_height]
+        rows = [row for row in rows if 0.5 * median_height <= row[0][3] <= 1.5 * median_height]
+
+        if merged or fragments or outliers:
+            logging.warning(f"Merged {merged} split rows, ignored {fragments} cell fragments and "
+                            f"{len(outliers)} rows of unexpected height in the table")
+        if len(rows) != EXPECTED_ROWS:
+            logging.warning(f"Found {len(rows)} player rows instead of {EXPECTED_ROWS}")
+        split_rows = sum(1 for row in rows if len(row) > 1)
+        if split_rows:
+            logging.warning(f"{split_rows} player rows are split into several cells, only the first one is read")
+        return rows
+
+    def crop_table_cells(image, image_colored, rows):
+        """
+        Crops the cell and headshot images of every row out of a table image.
 
-        rows.sort(key=avg_height_of_center)
+        Parameters:
+        image (numpy.ndarray): A grayscale table image.
+        image_colored (numpy.ndarray): The same table in color.
+        rows (list): Rows of (x, y, w, h) cell rectangles, as returned by detect_row_rects.
+
+        Returns:
+        cell_images_rows (list): A list of lists containing numpy.ndarray representing cell images.
+        headshot_images_rows (list): The matching colored headshot images.
+        """
         cell_images_rows = []
         headshot_images_rows = []
         for row in rows:
@@ -234,6 +384,83 @@ class functions:
         # return
         return cell_images_rows, headshot_images_rows
 
+    def extract_cell_images_from_table(image,image_colored):
+        """
+        Extracts cell images from a table image.
+
+        Parameters:
+        image (numpy.ndarray): A table image.
+
+        Returns:
+        cell_images_rows (list): A list of lists containing numpy.ndarray representing cell images.
+        """
+        rows = functions.detect_row_rects(image)
+        return functions.crop_table_cells(image, image_colored, rows)
+
+    def detect_table_layout(image):
+        """
+        Detects the table of a screenshot and the cells of its rows in one pass.
+        The cell detection works on ROI views of the table detection's buffers,
+        so no other full size images are allocated.
+
+        Parameters:
+        image (numpy.ndarray): A grayscale screenshot.
+
+        Returns:
+        table_rect (tuple): The (x, y, w, h) rectangle of the table.
+        rows (list): The cell rectangles of every row, in table coordinates.
+        """
+        buffers = functions.line_buffers(image.shape)
+        x, y, w, h = functions.detect_table_rect(image, buffers)
+        rows = functions.detect_row_rects(image[y:y+h, x:x+w], [b[y:y+h, x:x+w] for b in buffers])
+        return (x, y, w, h), rows
+
+    def locate_table(image, use_profiles=True):
+        """
+        Finds the scoreboard table of a screenshot and the cells of its rows.
+
+        When a layout profile exists for the screenshot resolution and its row
+        boundaries are found where expected, the stored rectangles are used
+        without running the table detection. A complete detection at a
+        resolution without a profile is stored as its profile.
+
+        Parameters:
+        image (numpy.ndarray): A grayscale screenshot.
+        use_profiles (bool): Use and learn layout profiles.
+
+        Returns:
+        table_rect (tuple): The (x, y, w, h) rectangle of the table.
+        rows (list): The cell rectangles of every row, in table coordinates.
+        """
+        height, width = image.shape[:2]
+        if use_profiles:
+            profile = layout_profiles.get(width, height)
+            if profile is not None:
+                if layout_profiles.verify(image, profile):
+                    return tuple(profile['table']), profile['rows']
+                logging.info(f"Stored layout for {width}x{height} does not fit, detecting the table")
+
+        table_rect, rows = functions.detect_table_layout(image)
+        if use_profiles:
+            layout_profiles.learn(width, height, table_rect, rows)
+        return table_rect, rows
+
+    def detect_table_cells(image, image_colored, use_profiles=True):
+        """
+        Finds the scoreboard table of a screenshot and extracts its cell images.
+
+        Parameters:
+        image (numpy.ndarray): A grayscale screenshot.
+        image_colored (numpy.ndarray): The same screenshot in color.
+        use_profiles (bool): Use and learn layout profiles, see locate_table.
+
+        Returns:
+        cell_images_rows (list): A list of lists containing numpy.ndarray representing cell images.
+        headshot_images_rows (list): The matching colored headshot images.
+        """
+        (x, y, w, h), rows = functions.locate_table(image, use_profiles)
+        return functions.crop_table_cells(image[y:y+h, x:x+w], image_colored[y:y+h, x:x+w], rows)
+
     def crop_to_text(image):
         """
         Crop an image to contain only the text region.
@@ -331,23 +558,75 @@ class functions:
         #write out image
         return inverted_image
 
-    def ocr_image(image: np.ndarray, config: str = '', lang: str = '') -> str:
+    def image_process_regions(image, regions, scale):
+        """
+        Applies the image_process enhancement to a few regions of an image only,
+        resizing each region straight to its OCR scale. The kernels of
+        image_process are scaled down from its 10x working size accordingly.
+
+        Args:
+            image: A grayscale image.
+            regions: A list of (x, y, w, h) rectangles in image coordinates.
+            scale: The factor each region is enlarged by.
+
+        Returns:
+            A list of processed images (black text on white), one per region.
+        """
+        def odd_kernel(size_at_10x):
+            return 2 * int(size_at_10x * scale / 20) + 1
+
+        dilate_size = odd_kernel(5)
+        blur_size = odd_kernel(3)
+        median_size = odd_kernel(9)
+
+        # A single Otsu threshold for the whole row, as image_process does
+        threshold, _ = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+        img_h, img_w = image.shape[:2]
+        processed = []
+        for x, y, w, h in regions:
+            x2, y2 = min(img_w, x + w), min(img_h, y + h)
+            region = image[y:y2, x:x2]
+            region = cv2.resize(region, ((x2 - x) * scale, (y2 - y) * scale), interpolation=cv2.INTER_LINEAR)
+            if dilate_size > 1:
+                region = cv2.dilate(region, np.ones((dilate_size, dilate_size), np.uint8), iterations=1)
+            if blur_size > 1:
+                region = cv2.GaussianBlur(region, (blur_size, blur_size), 0)
+            region = cv2.threshold(region, threshold, 255, cv2.THRESH_BINARY)[1]
+            if median_size > 1:
+                region = cv2.medianBlur(region, median_size)
+            processed.append(cv2.bitwise_not(region))
+        return processed
+
+    def ocr_image(image: np.ndarray, config: str = '', lang: str = '', use_cache: bool = True) -> str:
         """
         Perform OCR (Optical Character Recognition) on an image using Tesseract.
+        Goes through the shared OCR engine, so Tesseract stays loaded between calls.
+        Results are cached by image content, so identical crops are read once.
 
         Args:
             image (numpy.ndarray): The image to perform OCR on.
             config (str): Optional Tesseract configuration parameters.
             lang (str): Optional language code for Tesseract to use.
+            use_cache (bool): Look the image up in the OCR cache first.
 
         Returns:
             str: The recognized text in the image.
         """
-        return pytesseract.image_to_string(
+        if use_cache:
+            key = ocr_cache.make_key(image, 'ocr_image', config, lang)
+            cached = ocr_cache.get(key)
+            if cached is not None:
+                return cached
+
+        text = ocr_engine.image_to_string(
             image,
             config=config,
             lang=lang
         )
+        if use_cache:
+            ocr_cache.put(key, text)
+        return text
 
     def row_seperator(image, BLUR_KERNEL_SIZE_input):
         """
@@ -376,9 +655,8 @@ class functions:
             SUBTRACT_FROM_MEAN,
         )
         #cv2.imwrite('yoyo.png',img_bin)
-        vertical = horizontal = img_bin.copy()
         SCALE = 20
-        image_width, image_height = horizontal.shape
+        image_width, image_height = img_bin.shape
         horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (int(image_width / SCALE), 1))
         horizontally_opened = cv2.morphologyEx(img_bin, cv2.MORPH_OPEN, horizontal_kernel)
         vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, int(image_height / SCALE)))
@@ -454,136 +732,504 @@ class functions:
         Returns:
         list: A list of tuples representing the non-overlapping rectangles, with each tuple containing four values:
               the x-coordinate of the top-left corner, the y-coordinate of the top-left corner,
-              the width of the rectangle, and the height of the rectangle.
-        """
-        non_overlapping_rectangles = []
-        overlapping_rectangles = []
-        for i, rect1 in enumerate(rectangles):
-            overlaps = False
-            for j, rect2 in enumerate(rectangles):
-                if i != j:
-                    if rect1[0] < rect2[0] + rect2[2] and rect1[0] + rect1[2] > rect2[0] and rect1[1] < rect2[1] + rect2[3] and rect1[1] + rect1[3] > rect2[1]:
-                        overlaps = True
-                        if rect1[2] * rect1[3] > rect2[2] * rect2[3]:
-                            larger_rect = rect1
-                            smaller_rect = rect2
-                        else:
-                            larger_rect = rect2
-                            smaller_rect = rect1
-                        break
-            if overlaps:
-                overlapping_rectangles.append(smaller_rect)
+              the width of the rectangle, and the height of the rectangle. Rectangles keep the
+              order in which they are first kept.
+        """
+        # Sort and sweep along x: only rectangles whose x ranges can still
+        # intersect the current one are kept active, so each pair that overlaps
+        # horizontally is tested once instead of comparing all pairs.
+        first_overlap = [None] * len(rectangles)
+        active = set()
+        active_ends = []
+        for i in sorted(range(len(rectangles)), key=lambda k: rectangles[k][0]):
+            x, y, w, h = rectangles[i]
+            while active_ends and active_ends[0][0] <= x:
+                active.discard(heapq.heappop(active_ends)[1])
+            for j in active:
+                x2, y2, w2, h2 = rectangles[j]
+                if x < x2 + w2 and x + w > x2 and y < y2 + h2 and y + h > y2:
+                    # Each rectangle is judged against the first rectangle it overlaps
+                    if first_overlap[i] is None or j < first_overlap[i]:
+                        first_overlap[i] = j
+                    if first_overlap[j] is None or i < first_overlap[j]:
+                        first_overlap[j] = i
+            active.add(i)
+            heapq.heappush(active_ends, (x + w, i))
+
+        # Of each overlapping pair the larger rectangle is kept and the smaller
+        # one is dropped. A rectangle survives when it was kept more often than dropped.
+        kept = Counter()
+        dropped = Counter()
+        order = []
+        for i, rect in enumerate(rectangles):
+            j = first_overlap[i]
+            if j is None:
+                kept[rect] += 2
+                order.append(rect)
+                continue
+            other = rectangles[j]
+            if rect[2] * rect[3] > other[2] * other[3]:
+                larger_rect, smaller_rect = rect, other
             else:
-                non_overlapping_rectangles.append(rect1)
-                larger_rect = rect1
-            non_overlapping_rectangles.append(larger_rect)
-        for rect in overlapping_rectangles:
-            if rect in non_overlapping_rectangles:
-                non_overlapping_rectangles.remove(rect)
-        non_overlapping_rectangles = list(set(non_overlapping_rectangles))
-        return non_overlapping_rectangles
+                larger_rect, smaller_rect = other, rect
+            dropped[smaller_rect] += 1
+            kept[larger_rect] += 1
+            order.append(larger_rect)
+
+        # dict.fromkeys keeps the first occurrence order, unlike a set
+        return [rect for rect in dict.fromkeys(order) if kept[rect] > dropped[rect]]
 
-    def read_table_rows(cell_images_rows, headshot_images_rows=None):
+    def ocr_cells_composite(crops_rows, config=COMPOSITE_OCR_CONFIG, lang='eng'):
         """
-        Reads each player's stats from a table represented by a list of rows images.
-        Enhanced with leet speak detection and highlighted player recognition.
+        OCRs every cell crop of a table with a single engine call.
 
-        Parameters:
-        cell_image_rows (list): A list of rows images, each containing cells representing a player's stats.
-        headshot_images_rows (list): A list of headshot images for highlighted player detection.
+        The crops are tiled into one white canvas with one slot per (row, column),
+        separated by wide gaps, and the word boxes returned by Tesseract are mapped
+        back to their slot by position. Slots where no word was found are retried
+        individually so a missed cell never shifts the other stats.
+
+        Args:
+            crops_rows (list): A list of rows, each a list of black-on-white cell images.
+            config (str): Tesseract configuration for the composite pass.
+            lang (str): Language code for Tesseract to use.
 
         Returns:
-        output (list): A list of lists, where each sublist contains the player's name and stats in string format.
+            list: A list of rows, each a list of recognised strings in crop order.
         """
-        n=0
-        output=[]
+        crops = [crop for row in crops_rows for crop in row]
+        if not crops:
+            return [[] for _ in crops_rows]
+
+        max_height = max(crop.shape[0] for crop in crops)
+        max_width = max(crop.shape[1] for crop in crops)
+        gap = max(COMPOSITE_MIN_GAP, max_height)
+        slot_height = max_height + gap
+        slot_width = max_width + gap
+        columns = max(len(row) for row in crops_rows)
+
+        canvas = np.full((slot_height * len(crops_rows), slot_width * columns), 255, dtype=np.uint8)
+        for r, row in enumerate(crops_rows):
+            for c, crop in enumerate(row):
+                y = r * slot_height + gap // 2
+                x = c * slot_width + gap // 2
+                canvas[y:y + crop.shape[0], x:x + crop.shape[1]] = crop
+
+        data = ocr_engine.image_to_data(canvas, config=config, lang=lang)
+
+        # Assign each word to the slot that contains its centre
+        words = [[[] for _ in row] for row in crops_rows]
+        for text, left, top, width, height in zip(data['text'], data['left'], data['top'], data['width'], data['height']):
+            text = str(text).strip()
+            if not text:
+                continue
+            r = (int(top) + int(height) // 2) // slot_height
+            c = (int(left) + int(width) // 2) // slot_width
+            if r < len(crops_rows) and c < len(crops_rows[r]):
+                words[r][c].append((int(left), text))
+
+        results = []
+        missed = 0
+        for r, row in enumerate(crops_rows):
+            row_results = []
+            for c, crop in enumerate(row):
+                if words[r][c]:
+                    row_results.append(''.join(text for _, text in sorted(words[r][c])))
+                else:
+                    missed += 1
+                    row_results.append(str(functions.ocr_image(crop, DIGIT_CELL_OCR_CONFIG, lang, use_cache=False)).strip())
+            results.append(row_results)
+
+        if missed:
+            logging.info(f"Composite OCR missed {missed} of {len(crops)} cells, read them individually")
+        return results
+
+    def segment_stat_cells(image):
+        """
+        Finds the stat cells of a player row with a vertical projection profile.
+
+        The stat area is binarized once and its columns of ink are grouped into
+        numbers: gaps narrower than STAT_GLYPH_GAP of the row width separate digits,
+        wider gaps separate cells.
+
+        Args:
+            image: A grayscale image of a single player row.
+
+        Returns:
+            list: Exactly STAT_COLUMNS (x, y, w, h) rectangles ordered left to right,
+            or None if the row does not show that many numbers.
+        """
+        img_h, img_w = image.shape[:2]
+        start = int(STAT_AREA_START * img_w)
+        _, mask = cv2.threshold(image[:, start:], 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # The background fills the top and bottom edges, so the class that dominates them is not ink
+        border = np.concatenate([mask[0], mask[-1]])
+        if np.count_nonzero(border) > border.size / 2:
+            mask = cv2.bitwise_not(mask)
+
+        ink = np.count_nonzero(mask, axis=0)
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], ink > 0, [0]]).astype(np.int8)))
+        max_gap = max(1, round(STAT_GLYPH_GAP * img_w))
+        groups = []
+        for run_start, run_end in zip(edges[::2], edges[1::2]):
+            if groups and run_start - groups[-1][1] <= max_gap:
+                groups[-1][1] = run_end
+            else:
+                groups.append([run_start, run_end])
+        groups = [g for g in groups if ink[g[0]:g[1]].sum() >= STAT_MIN_INK]
+        if len(groups) != STAT_COLUMNS:
+            return None
+
+        cells = []
+        for group_start, group_end in groups:
+            ink_rows = np.flatnonzero(np.count_nonzero(mask[:, group_start:group_end], axis=1))
+            x1 = max(0, start + group_start - STAT_CELL_PADDING)
+            x2 = min(img_w, start + group_end + STAT_CELL_PADDING)
+            y1 = max(0, ink_rows[0] - STAT_CELL_PADDING)
+            y2 = min(img_h, ink_rows[-1] + 1 + STAT_CELL_PADDING)
+            cells.append((int(x1), int(y1), int(x2 - x1), int(y2 - y1)))
+        return cells
+
+    def consensus_stat_cells(layouts, row_height):
+        """
+        Builds a stat cell layout for a row from the layouts found in the other rows.
+
+        Args:
+            layouts (list): Stat cell layouts from segment_stat_cells (None entries are ignored).
+            row_height (int): Height of the row the layout is for.
+
+        Returns:
+            list: STAT_COLUMNS rectangles spanning the widest number seen in each
+            column over the full row height, or None if no row had a layout.
+        """
+        layouts = [layout for layout in layouts if layout]
+        if not layouts:
+            return None
+        cells = []
+        for column in zip(*layouts):
+            x1 = min(x for x, _, _, _ in column)
+            x2 = max(x + w for x, _, w, _ in column)
+            cells.append((x1, 0, x2 - x1, row_height))
+        return cells
+
+    def prepare_row(image, preprocess='roi', cells=None):
+        """
+        Locates the stat cells of a player row and prepares the row for OCR.
+
+        Args:
+            image: A grayscale image of a single player row.
+            preprocess (str): 'roi' processes only the name area and the cells, each
+                              directly at its OCR scale. 'legacy' processes the
+                              whole row at 10x and crops from that.
+            cells (list): Stat cell rectangles to use instead of locating them.
+
+        Returns:
+            tuple: (name_region, crops) where name_region is the processed name area
+            and crops is a list of STAT_COLUMNS processed stat cell images ordered left
+            to right, or None if the row does not show that many cells.
+        """
+        if preprocess not in ('roi', 'legacy'):
+            raise ValueError(f"Unknown row preprocessing: {preprocess}")
         scale = 10
-        logging.info("Reading each players stats with enhanced OCR, please wait.")
-        
-        for i, row in enumerate(cell_images_rows):
-            temp_output=[]
-            n+=1
-            # cv2.imwrite("debug/test_rows" +str(n) + ".png", row[0]) # for debugging
-            image=row[0]
-            
-            # Check if this player is highlighted (yellow background)
-            is_highlighted = False
-            if headshot_images_rows and i < len(headshot_images_rows):
-                try:
-                    is_highlighted, _ = enhanced_ocr.detect_highlighted_player(
-                        headshot_images_rows[i][0], row
-                    )
-                    if is_highlighted:
-                        logging.info(f"Detected highlighted player in row {n}")
-                except Exception as e:
-                    logging.warning(f"Failed to detect highlighting for row {n}: {e}")
-
-            #Seperate rows
+
+        if cells is None:
+            cells = functions.segment_stat_cells(image)
+        if cells is None:
+            #No clean projection and no layout from other rows, fall back to contours
+            logging.info("Stat cells not found by projection, detecting them with contours")
             cells=functions.row_seperator(image,(9,9))
             cells=sorted(cells,key=lambda x:x[0])
+            cells = [c for c in cells if c[0] > (STAT_AREA_START*(image.shape[1]))]
+            if len(cells) != STAT_COLUMNS:
+                # Reading them anyway would shift the stats into the wrong columns
+                logging.warning(f"Found {len(cells)} stat cells instead of {STAT_COLUMNS}, the stats of this row are not read")
+                cells = None
+
+        if preprocess == 'roi':
+            name_region, = functions.image_process_regions(image, [NAME_ROI], NAME_ROI_SCALE)
+            crops = functions.image_process_regions(image, cells, CELL_ROI_SCALE) if cells is not None else None
+            return name_region, crops
+
+        #Process image for OCR
+        image=functions.image_process(image)
+        name_region=image[0:100*scale,0:300*scale]
+        if cells is None:
+            return name_region, None
+
+        #Prepare each cell for OCR
+        crops=[]
+        for c, cnt in enumerate(cells):
+            x, y, w, h = cnt
+            cropped=image[scale*y:scale*(y+h), scale*x:scale*(x+w)]
+            cropped=functions.image_resize(cropped,20)
+            # Define the kernel size for dilation
+            kernel = np.ones((1, 1), np.uint8)
+            # Apply dilation on the grayscale image
+            cropped = cv2.dilate(cropped, kernel, iterations=1)
+            #cropped = cv2.copyMakeBorder(cropped, 2, 2, 2, 2, cv2.BORDER_CONSTANT, None, 0)
+            #cv2.imwrite("crop"+str(c)+".png",cropped)
+            crops.append(cropped)
+
+        return name_region, crops
+
+    def read_stat_cells(crops_rows, composite_stats=False, use_digit_templates=True):
+        """
+        Reads the numeric stat cells of every row.
+
+        Cells are first classified by the digit template recognizer. Any cell it is
+        not confident about is read by Tesseract, either cell by cell or in one
+        composite pass.
 
-            #Seperate the cells
-            cells = [c for c in cells if c[0] > (0.24*(row[0].shape[1]))]
+        Args:
+            crops_rows (list): A list of rows, each a list of processed cell images, or
+                               None for rows whose stat cells were not found.
+            composite_stats (bool): Read the Tesseract cells in a single composite call.
+            use_digit_templates (bool): Try the digit template recognizer first.
 
-            #Get cells again if did not capture them all
-            if len(cells) != 8:
-                cells=functions.row_seperator(image,(11,11))
-                cells=sorted(cells,key=lambda x:x[0])
-                cells = [c for c in cells if c[0] > (0.24*(row[0].shape[1]))]
+        Returns:
+            list: A list of rows, each a list of recognised strings in crop order.
+            Rows without cells read "err" in all STAT_COLUMNS columns.
+        """
+        located = [r for r, crops in enumerate(crops_rows) if crops is not None]
+        if len(located) < len(crops_rows):
+            results = [['err'] * STAT_COLUMNS for _ in crops_rows]
+            if located:
+                read = functions.read_stat_cells([crops_rows[r] for r in located], composite_stats, use_digit_templates)
+                for r, row in zip(located, read):
+                    results[r] = row
+            return results
+
+        results = [[None] * len(crops) for crops in crops_rows]
+        # Identical cells (a 0 in the same column, the same ACS in the next
+        # screenshot of a series) are answered from the OCR cache. The key holds
+        # everything that decides the result: the Tesseract mode, config and
+        # language, and the digit templates in use
+        if composite_stats:
+            tesseract_mode = ('composite', COMPOSITE_OCR_CONFIG, 'eng')
+        else:
+            tesseract_mode = ('cell', DIGIT_CELL_OCR_CONFIG, 'eng')
+        use_digit_templates = use_digit_templates and digit_recognizer.has_templates()
+        if use_digit_templates:
+            template_mode = ('templates', digit_recognizer.fingerprint, DIGIT_TEMPLATE_MIN_CONFIDENCE)
+        else:
+            template_mode = ('no_templates',)
+        keys = [
+            [ocr_cache.make_key(cropped, 'stat_cell', *tesseract_mode, *template_mode) for cropped in crops]
+            for crops in crops_rows
+        ]
+        for r, crops in enumerate(crops_rows):
+            for c in range(len(crops)):
+                results[r][c] = ocr_cache.get(keys[r][c])
+
+        if use_digit_templates:
+            for r, crops in enumerate(crops_rows):
+                for c, cropped in enumerate(crops):
+                    if results[r][c] is not None:
+                        continue
+                    text, confidence = digit_recognizer.recognize(cropped)
+                    if text and confidence >= DIGIT_TEMPLATE_MIN_CONFIDENCE:
+                        results[r][c] = text
+
+        # Everything the templates could not read goes to Tesseract
+        pending = [
+            [(c, cropped) for c, cropped in enumerate(crops) if results[r][c] is None]
+            for r, crops in enumerate(crops_rows)
+        ]
+        pending_count = sum(len(row) for row in pending)
+        if pending_count:
+            logging.info(f"Reading {pending_count} stat cells with Tesseract")
+        if composite_stats:
+            texts = functions.ocr_cells_composite([[cropped for _, cropped in row] for row in pending])
+        else:
+            texts = [
+                [str(functions.ocr_image(cropped, DIGIT_CELL_OCR_CONFIG, 'eng', use_cache=False)).strip() for _, cropped in row]
+                for row in pending
+            ]
+        for r, row in enumerate(pending):
+            for (c, _), text in zip(row, texts[r]):
+                results[r][c] = text
+
+        for r, row in enumerate(results):
+            for c, text in enumerate(row):
+                ocr_cache.put(keys[r][c], text)
+
+        return results
+
+    def read_row(image, headshot_row=None, cell_row=None, preprocess='roi', stats=False, use_digit_templates=True, cells=None, name_configs=None):
+        """
+        Reads the name of a single player row and prepares its stat cells.
+
+        Parameters:
+        image: A grayscale image of the player row.
+        headshot_row (list): The headshot images of the row, for highlighted player detection.
+        cell_row (list): The cell images of the row, for highlighted player detection.
+        preprocess (str): Row preprocessing passed to prepare_row ('roi' or 'legacy').
+        stats (bool): Also read the stat cells of the row.
+        use_digit_templates (bool): Read stat cells with the digit template recognizer first.
+        cells (list): Stat cell rectangles, located by prepare_row when not given.
+        name_configs (list): Name OCR configurations in the order to try them. When given,
+                             the winning configuration is returned in the row instead of
+                             being counted, see read_table_rows.
 
-            #Process image for OCR
-            image=functions.image_process(image)
-            name_region=image[0:100*scale,0:300*scale]
-            
-            # Enhanced name OCR with leet speak detection
+        Returns:
+        row (dict): name, crops, stats (None unless requested), highlighted,
+                    highlight_error, attempts, lang and config (the winning name OCR
+                    configuration still to be counted, or None) of the row.
+        """
+        # Check if this player is highlighted (yellow background)
+        is_highlighted = False
+        highlight_error = None
+        if headshot_row:
             try:
-                # Preprocess the name image
-                processed_name = enhanced_ocr.preprocess_name_image(name_region, is_highlighted)
-                
-                # Use enhanced OCR
-                ocr_name = enhanced_ocr.enhanced_ocr_name(processed_name, is_highlighted)
-                
-                if not ocr_name or ocr_name.strip() == "":
-                    # Fallback to original method
-                    ocr_name = functions.ocr_image(
-                        name_region,
-                        '-c tessedit_char_whitelist=abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789/_ --psm 7',
-                        'eng+kor+jpn+chi_sim'
-                    )
-                    
+                is_highlighted, _ = enhanced_ocr.detect_highlighted_player(headshot_row[0], cell_row)
             except Exception as e:
-                logging.warning(f"Enhanced OCR failed for row {n}, using fallback: {e}")
-                # Fallback to original OCR
+                highlight_error = e
+
+        #Find the name region and the stat cells
+        name_region, crops = functions.prepare_row(image, preprocess, cells)
+
+        # Enhanced name OCR with leet speak detection
+        name_attempts = 0
+        name_lang = 'eng+kor+jpn+chi_sim'
+        name_config = None
+        try:
+            # Preprocess the name image
+            processed_name = enhanced_ocr.preprocess_name_image(name_region, is_highlighted)
+
+            # Use enhanced OCR, it stops at the first confident configuration
+            ocr_name, name_info = enhanced_ocr.enhanced_ocr_name_with_info(
+                processed_name, is_highlighted, name_configs, record_win=name_configs is None
+            )
+            name_attempts = name_info['attempts']
+            # None when nothing was read, the fallback below then uses all languages
+            name_lang = name_info['lang'] or name_lang
+            # Cached names were counted when they were first read
+            if name_configs is not None and not name_info.get('cached'):
+                name_config = name_info['config']
+
+            if ocr_name == "err":
+                # No configuration read anything, fall back to the original method
                 ocr_name = functions.ocr_image(
                     name_region,
                     '-c tessedit_char_whitelist=abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789/_ --psm 7',
                     'eng+kor+jpn+chi_sim'
                 )
-            
-            if str(ocr_name).strip() == "":
-                ocr_name = "err"
-            
-            # Add highlighting indicator to name if detected
-            final_name = str(ocr_name).strip()
-            if is_highlighted and not final_name.startswith("[H]"):
-                final_name = f"[H] {final_name}"  # [H] indicates highlighted player
-                
-            temp_output.append(final_name)
-            logging.info(f"Name: {final_name}" + (" (HIGHLIGHTED)" if is_highlighted else ""))
-
-            #OCR each cell to get numbers
-            for c, cnt in enumerate(cells):
-                x, y, w, h = cnt
-                cropped=image[scale*y:scale*(y+h), scale*x:scale*(x+w)]
-                cropped=functions.image_resize(cropped,20)
-                # Define the kernel size for dilation
-                kernel = np.ones((1, 1), np.uint8)
-                # Apply dilation on the grayscale image
-                cropped = cv2.dilate(cropped, kernel, iterations=1)
-                #cropped = cv2.copyMakeBorder(cropped, 2, 2, 2, 2, cv2.BORDER_CONSTANT, None, 0)
-                #cv2.imwrite("crop"+str(c)+".png",cropped)
-                ocr_cropped=functions.ocr_image(cropped, '-c tessedit_char_whitelist=0123456789 --psm 7', 'eng')
-                temp_output.append(str(ocr_cropped).strip())
+
+        except Exception as e:
+            logging.warning(f"Enhanced OCR failed, using fallback: {e}")
+            # Fallback to original OCR
+            ocr_name = functions.ocr_image(
+                name_region,
+                '-c tessedit_char_whitelist=abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789/_ --psm 7',
+                'eng+kor+jpn+chi_sim'
+            )
+
+        if str(ocr_name).strip() == "":
+            ocr_name = "err"
+
+        # Add highlighting indicator to name if detected
+        final_name = str(ocr_name).strip()
+        if is_highlighted and not final_name.startswith("[H]"):
+            final_name = f"[H] {final_name}"  # [H] indicates highlighted player
+
+        row_stats = None
+        if stats:
+            row_stats = functions.read_stat_cells([crops], False, use_digit_templates)[0]
+
+        return {
+            'name': final_name,
+            'crops': crops,
+            'stats': row_stats,
+            'highlighted': is_highlighted,
+            'highlight_error': highlight_error,
+            'attempts': name_attempts,
+            'lang': name_lang,
+            'config': name_config,
+        }
+
+    def read_table_rows(cell_images_rows, headshot_images_rows=None, composite_stats=False, use_digit_templates=True, preprocess='roi', max_workers=None):
+        """
+        Reads each player's stats from a table represented by a list of rows images.
+        Enhanced with leet speak detection and highlighted player recognition.
+
+        Parameters:
+        cell_image_rows (list): A list of rows images, each containing cells representing a player's stats.
+        headshot_images_rows (list): A list of headshot images for highlighted player detection.
+        composite_stats (bool): OCR all stat cells of the table in one engine call
+                                instead of one call per cell.
+        use_digit_templates (bool): Read stat cells with the digit template recognizer,
+                                    falling back to Tesseract for low confidence cells.
+        preprocess (str): Row preprocessing passed to prepare_row ('roi' or 'legacy').
+        max_workers (int): Read up to this many rows at once on a thread pool.
+                           None or 1 reads the rows one after another.
+
+        Returns:
+        output (list): A list of lists, where each sublist contains the player's name and stats in string format.
+        """
+        output=[]
+        logging.info("Reading each players stats with enhanced OCR, please wait.")
+
+        # Rows whose numbers cannot be separated use the columns found in the other rows
+        found_layouts = [functions.segment_stat_cells(row[0]) for row in cell_images_rows]
+        layouts = []
+        for n, layout in enumerate(found_layouts, start=1):
+            if layout is None:
+                layout = functions.consensus_stat_cells(found_layouts, cell_images_rows[n - 1][0].shape[0])
+                if layout is not None:
+                    logging.info(f"Stat cells of row {n} not found, using the column layout of the other rows")
+            layouts.append(layout)
+
+        # Every row tries the name configurations in the same order, whichever row finishes
+        # first, and the wins of this table only reorder them for the next table
+        name_configs = enhanced_ocr.ordered_ocr_configs()
+
+        def read_one(i):
+            # cv2.imwrite("debug/test_rows" +str(i+1) + ".png", cell_images_rows[i][0]) # for debugging
+            headshot_row = None
+            if headshot_images_rows and i < len(headshot_images_rows):
+                headshot_row = headshot_images_rows[i]
+            return functions.read_row(
+                cell_images_rows[i][0], headshot_row, cell_images_rows[i], preprocess,
+                stats=not composite_stats, use_digit_templates=use_digit_templates, cells=layouts[i],
+                name_configs=name_configs
+            )
+
+        rows = None
+        indices = range(len(cell_images_rows))
+        if max_workers is not None and max_workers > 1 and len(cell_images_rows) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = []
+                try:
+                    for i in indices:
+                        futures.append(pool.submit(read_one, i))
+                except RuntimeError as e:
+                    # Not every row could be started, the rows already submitted are
+                    # kept and the remaining rows are read serially below
+                    logging.warning(f"Parallel row reading unavailable, reading {len(indices) - len(futures)} rows serially: {e}")
+                # Collected in submission order, so the output keeps the row order
+                rows = [future.result() for future in futures]
+        if rows is None:
+            rows = []
+        rows += [read_one(i) for i in indices[len(rows):]]
+        enhanced_ocr.record_config_wins([row['config'] for row in rows])
+
+        for n, row in enumerate(rows, start=1):
+            if row['highlight_error'] is not None:
+                logging.warning(f"Failed to detect highlighting for row {n}: {row['highlight_error']}")
+            elif row['highlighted']:
+                logging.info(f"Detected highlighted player in row {n}")
+            logging.info(f"Name: {row['name']}" + (" (HIGHLIGHTED)" if row['highlighted'] else "") + f" [{row['attempts']} OCR attempts, lang={row['lang']}]")
+
+        #OCR each cell to get numbers
+        if composite_stats:
+            row_stats = functions.read_stat_cells([row['crops'] for row in rows], True, use_digit_templates)
+        else:
+            row_stats = [row['stats'] for row in rows]
+
+        logging.info(f"Name OCR so far: {enhanced_ocr.name_ocr_report()}")
+        logging.info(f"OCR cache: {ocr_cache.stats()}")
+
+        for row, stats in zip(rows, row_stats):
+            temp_output = [row['name']] + stats
             temp_output = [e for e in temp_output if e]
             output.append(temp_output)
         # remove the sorting step
@@ -606,33 +1252,43 @@ class functions:
             writer.writerows(output)
 
 
-    def identify_agents(headshots_images_rows):
+    def identify_agents(headshots_images_rows, engine='sift'):
         """
         Identifies agents from the headshot images.
 
         Parameters:
         headshots (List[numpy.ndarray]): A list of headshot images.
+        engine (str): 'sift' matches each headshot with SIFT/ORB/histogram voting,
+                      'batch' scores all headshots at once with vectorized features,
+                      'cascade' uses the batch score and falls back to SIFT/ORB
+                      for the top candidates when the batch margin is small.
 
         Returns:
         List[str]: A list of agent names.
         """
-        # Load reference images and agent names
+        # Reference features are extracted once per process and reused
         reference_folder = './agent-images'
-        reference_images, agent_names = load_images_from_folder(reference_folder)
+        agent_index = get_agent_index(reference_folder)
+
+        if engine == 'batch':
+            matches = agent_index.match_batch([row[0] for row in headshots_images_rows])
+            for n, (agent_name, margin) in enumerate(matches, start=1):
+                logging.debug(f"Row {n}: {agent_name} (margin {margin:.3f})")
+            return [agent_name.capitalize() for agent_name, _ in matches]
+        elif engine == 'cascade':
+            matches = agent_index.match_cascade([row[0] for row in headshots_images_rows])
+            stages = Counter(stage for _, stage in matches)
+            logging.info(f"Agent cascade decisions: {stages['coarse']} coarse, {stages['fine']} fine "
+                         f"(all time: {agent_index.cascade_report()})")
+            return [agent_name.capitalize() for agent_name, _ in matches]
+        elif engine != 'sift':
+            raise ValueError(f"Unknown agent recognition engine: {engine}")
 
         identified_agents = []
-        n=0
-        temp_image_path = './temp_headshot.png'
         for row in headshots_images_rows:
-            n+=1
-            # Save the headshot temporarily
-            cv2.imwrite(temp_image_path, row[0])
-
-            # Identify the agent
-            agent_name = find_matching_agent(temp_image_path, reference_images, agent_names)
+            # Identify the agent straight from the in-memory crop
+            agent_name = agent_index.match_image(row[0])
             agent_name = agent_name.capitalize() # Capitalization of Agent Name
             identified_agents.append(agent_name)
-        # remove temp_headshot.png
-        # os.remove(temp_image_path)
 
         return identified_agents
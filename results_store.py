@@ -0,0 +1,292 @@
+"""
+Results Store Module
+Keeps every processed screenshot and its player rows in SQLite, so results
+can be queried later instead of re-uploading screenshots to rebuild a CSV.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from auto_detection import TeamDetector
+from dedup import MAX_TABLE_DISTANCE, hash_distance
+
+# Stat columns of a merged row, after date, player, map and agent
+STAT_FIELDS = ('acs', 'kills', 'deaths', 'assists', 'econ', 'first_bloods', 'plants', 'defuses')
+# Page size of queries when none is given, and the largest page served
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS screenshots (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL,
+    source TEXT NOT NULL,
+    map TEXT COLLATE NOCASE,
+    date TEXT,
+    row_count INTEGER NOT NULL,
+    processed_at REAL NOT NULL,
+    content_hash TEXT,
+    table_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS rows (
+    id INTEGER PRIMARY KEY,
+    screenshot_id INTEGER NOT NULL REFERENCES screenshots(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    date TEXT,
+    player TEXT COLLATE NOCASE,
+    team_tag TEXT COLLATE NOCASE,
+    map TEXT COLLATE NOCASE,
+    agent TEXT COLLATE NOCASE,
+    {', '.join(f'{field} INTEGER' for field in STAT_FIELDS)}
+);
+CREATE INDEX IF NOT EXISTS idx_rows_screenshot ON rows(screenshot_id, position);
+CREATE INDEX IF NOT EXISTS idx_rows_player ON rows(player);
+CREATE INDEX IF NOT EXISTS idx_rows_team_tag ON rows(team_tag);
+CREATE INDEX IF NOT EXISTS idx_rows_map ON rows(map);
+CREATE INDEX IF NOT EXISTS idx_rows_agent ON rows(agent);
+CREATE INDEX IF NOT EXISTS idx_rows_date ON rows(date);
+CREATE INDEX IF NOT EXISTS idx_screenshots_date ON screenshots(date);
+"""
+# Screenshot columns added after the first version of the schema
+ADDED_SCREENSHOT_COLUMNS = ('content_hash', 'table_hash')
+# Indexes of the duplicate lookups, created once the added columns exist
+DEDUP_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_screenshots_content_hash ON screenshots(content_hash);
+CREATE INDEX IF NOT EXISTS idx_screenshots_map ON screenshots(map);
+"""
+
+# Query filters of each table: parameter name -> SQL condition
+ROW_FILTERS = {
+    'player': "player = ?",
+    'search': "player LIKE '%' || ? || '%'",
+    'team_tag': "team_tag = ?",
+    'map': "map = ?",
+    'agent': "agent = ?",
+    'date_from': "date >= ?",
+    'date_to': "date <= ?",
+    'screenshot_id': "screenshot_id = ?",
+}
+SCREENSHOT_FILTERS = {
+    'map': "map = ?",
+    'source': "source = ?",
+    'date_from': "date >= ?",
+    'date_to': "date <= ?",
+}
+
+
+def get_base_path():
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def iso_date(date: str) -> Optional[str]:
+    """Convert the dd/mm/YYYY date of merged rows to sortable YYYY-MM-DD"""
+    try:
+        return datetime.strptime(date, "%d/%m/%Y").strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def display_date(date: Optional[str]) -> str:
+    """Convert a stored YYYY-MM-DD date back to the dd/mm/YYYY of merged rows"""
+    try:
+        return datetime.strptime(date, "%Y-%m-%d").strftime("%d/%m/%Y")
+    except (TypeError, ValueError):
+        return ""
+
+
+def stored_text(value: Any) -> str:
+    """A row value as screenshot_rows() reads it back: integers without padding, missing values as ''"""
+    if value is None:
+        return ''
+    text = str(value)
+    try:
+        return str(int(text))
+    except ValueError:
+        return text
+
+
+def stored_row(row: List) -> List[str]:
+    """Player, map, agent and stats of a merged row as they read back from the store"""
+    size = 3 + len(STAT_FIELDS)
+    return [stored_text(value) for value in (list(row[1:]) + [None] * size)[:size]]
+
+
+def same_rows(rows1: List[List], rows2: List[List]) -> bool:
+    """Whether two lists of merged rows have the same players, map, agents and stats, ignoring the date"""
+    return len(rows1) == len(rows2) and all(stored_row(row1) == stored_row(row2) for row1, row2 in zip(rows1, rows2))
+
+
+class ResultsStore:
+    """
+    SQLite store of processed screenshots and their player rows.
+
+    Stat columns have INTEGER affinity, so stats that were read as numbers are
+    stored as integers while unreadable OCR output is kept as text.
+    """
+
+    def __init__(self, db_path: str = './results.sqlite'):
+        if db_path != ':memory:' and not os.path.isabs(db_path):
+            db_path = os.path.join(get_base_path(), db_path)
+        self.db_path = db_path
+        self._db = None
+        self._lock = threading.Lock()
+        self._team_detector = TeamDetector()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use, must be called with the lock held"""
+        if self._db is None:
+            db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA foreign_keys = ON")
+            db.executescript(SCHEMA)
+            columns = {column[1] for column in db.execute("PRAGMA table_info(screenshots)")}
+            for column in ADDED_SCREENSHOT_COLUMNS:
+                if column not in columns:
+                    db.execute(f"ALTER TABLE screenshots ADD COLUMN {column} TEXT")
+            db.executescript(DEDUP_INDEXES)
+            db.commit()
+            self._db = db
+        return self._db
+
+    def save_screenshot(self, filename: str, rows: List[List], source: str = 'web',
+                        content_hash: Optional[str] = None, table_hash: Optional[str] = None) -> int:
+        """
+        Store one processed screenshot with its merged rows (date, player, map, agent, stats)
+        and the dedup hashes that recognize it later.
+
+        Returns:
+            The id of the new screenshot.
+        """
+        records = []
+        for position, row in enumerate(rows):
+            date, player, map_name, agent = (list(row[:4]) + [None] * 4)[:4]
+            stats = (list(row[4:]) + [None] * len(STAT_FIELDS))[:len(STAT_FIELDS)]
+            team_tag = self._team_detector.extract_team_tag(player) if player else ""
+            records.append((position, iso_date(date), player, team_tag, map_name, agent, *stats))
+
+        date = records[0][1] if records else iso_date(datetime.now().strftime("%d/%m/%Y"))
+        map_name = records[0][4] if records else None
+        with self._lock:
+            db = self._connect()
+            with db:
+                cursor = db.execute(
+                    "INSERT INTO screenshots (filename, source, map, date, row_count, processed_at, content_hash, table_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (filename, source, map_name, date, len(records), time.time(), content_hash, table_hash),
+                )
+                screenshot_id = cursor.lastrowid
+                db.executemany(
+                    f"INSERT INTO rows (screenshot_id, position, date, player, team_tag, map, agent, {', '.join(STAT_FIELDS)}) "
+                    f"VALUES ({', '.join('?' * (7 + len(STAT_FIELDS)))})",
+                    [(screenshot_id, *record) for record in records],
+                )
+        return screenshot_id
+
+    def find_by_content(self, content_hash: str) -> Optional[int]:
+        """Id of the stored screenshot with exactly these file bytes"""
+        with self._lock:
+            db = self._connect()
+            row = db.execute(
+                "SELECT id FROM screenshots WHERE content_hash = ? ORDER BY id LIMIT 1", (content_hash,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def find_similar(self, table_hash: str, map_name: str, max_distance: int = MAX_TABLE_DISTANCE) -> List[int]:
+        """Ids of the stored screenshots of the same map whose table hash is close enough, closest first"""
+        with self._lock:
+            db = self._connect()
+            candidates = db.execute(
+                "SELECT id, table_hash FROM screenshots WHERE map = ? AND table_hash IS NOT NULL ORDER BY id",
+                (map_name,),
+            ).fetchall()
+
+        matches = []
+        for screenshot_id, stored_hash in candidates:
+            try:
+                distance = hash_distance(table_hash, stored_hash)
+            except ValueError:
+                # Stored with another hash size
+                continue
+            if distance <= max_distance:
+                matches.append((distance, screenshot_id))
+        return [screenshot_id for _, screenshot_id in sorted(matches)]
+
+    def find_same_scoreboard(self, table_hash: str, map_name: str, rows: List[List],
+                             max_distance: int = MAX_TABLE_DISTANCE) -> Optional[int]:
+        """
+        Id of a stored screenshot showing the same scoreboard as freshly read rows.
+
+        A close table hash alone is not enough: two games on the same map with the
+        same players can hash close together. The candidates are confirmed by
+        comparing their stored rows with the rows read from the new screenshot.
+        """
+        for screenshot_id in self.find_similar(table_hash, map_name, max_distance):
+            if same_rows(rows, self.screenshot_rows(screenshot_id)):
+                return screenshot_id
+        return None
+
+    def screenshot_rows(self, screenshot_id: int) -> List[List]:
+        """The stored rows of a screenshot in merged row format, as the pipeline returns them"""
+        with self._lock:
+            db = self._connect()
+            rows = db.execute(
+                f"SELECT date, player, map, agent, {', '.join(STAT_FIELDS)} FROM rows "
+                "WHERE screenshot_id = ? ORDER BY position",
+                (screenshot_id,),
+            ).fetchall()
+        return [
+            [display_date(row['date']), row['player'], row['map'], row['agent']]
+            + ['' if row[field] is None else str(row[field]) for field in STAT_FIELDS]
+            for row in rows
+        ]
+
+    def _query(self, table: str, filter_sql: Dict[str, str], filters: Dict[str, Any], order: str,
+               limit: int, offset: int) -> Tuple[List[Dict], int]:
+        unknown = set(filters) - set(filter_sql)
+        if unknown:
+            raise ValueError(f"unknown filter: {', '.join(sorted(unknown))}")
+        conditions = [filter_sql[name] for name, value in filters.items() if value not in (None, '')]
+        params = [value for value in filters.values() if value not in (None, '')]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        offset = max(0, int(offset))
+
+        with self._lock:
+            db = self._connect()
+            total = db.execute(f"SELECT COUNT(*) FROM {table} {where}", params).fetchone()[0]
+            items = db.execute(
+                f"SELECT * FROM {table} {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [dict(item) for item in items], total
+
+    def query_rows(self, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0, **filters) -> Tuple[List[Dict], int]:
+        """
+        One page of player rows, newest first, and the number of matching rows.
+
+        Filters (all optional): player, team_tag, map and agent match exactly
+        (case-insensitive), search matches part of the player name, date_from
+        and date_to take YYYY-MM-DD dates, screenshot_id selects one screenshot.
+        """
+        return self._query('rows', ROW_FILTERS, filters, "date DESC, screenshot_id DESC, position", limit, offset)
+
+    def query_screenshots(self, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0, **filters) -> Tuple[List[Dict], int]:
+        """One page of screenshots, newest first. Filters: map, source, date_from, date_to"""
+        return self._query('screenshots', SCREENSHOT_FILTERS, filters, "date DESC, id DESC", limit, offset)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Global instance for use in other modules
+results_store = ResultsStore(os.environ.get('RESULTS_DB') or './results.sqlite')